@@ -1,13 +1,16 @@
 # crp_accounting/admin.py
 
 from django.contrib import admin
-from django.utils.html import format_html
+from django.db.models import F
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
 # Import models from coa.py
 from ..models.coa import AccountGroup, Account
 # --- Import the new PLSection enum ---
-from ..models.coa import PLSection
+from ..models.coa import PLSection, clear_control_account_pks
+from .utils import change_url_template, is_autocomplete_request, is_changelist_request
 
 #------------------------------------------------------------------------------
 # Inline Admin: Account inside AccountGroup (No change needed for pl_section)
@@ -69,32 +72,41 @@ class AccountGroupAdmin(admin.ModelAdmin):
     )
 
     def get_queryset(self, request):
-        """Optimize queries by prefetching related parent_group."""
-        return super().get_queryset(request).select_related('parent_group').order_by('name')
+        """Annotate the parent's name/PK so list rows never touch the parent_group relation."""
+        return super().get_queryset(request).annotate(
+            parent_name=F('parent_group__name'),
+            parent_pk=F('parent_group_id'),
+        ).order_by('name')
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Autocomplete (e.g. Account.account_group) only needs id + name: match on the
+        trigram-indexed name alone instead of name OR description.
+        """
+        if is_autocomplete_request(request):
+            queryset = queryset.only('id', 'name')
+            if search_term:
+                queryset = queryset.filter(name__icontains=search_term)
+            return queryset, False
+        return super().get_search_results(request, queryset, search_term)
 
     def get_level(self, obj):
-        """Recursively calculate the nesting level of the group."""
-        level = 0
-        parent = obj.parent_group
-        while parent:
-            level += 1
-            parent = parent.parent_group
-        return level
+        """Nesting level of the group, read from the denormalized depth column (no queries)."""
+        return obj.depth
 
     @admin.display(description=_('Group Name (Hierarchy)'), ordering='name')
     def display_name_with_indent(self, obj):
         """Display group name with visual indentation for hierarchy."""
         level = self.get_level(obj)
-        indent = '    ' * level # Using non-breaking spaces
-        return format_html('{}{}', format_html(indent), obj.name)
+        # CSS indent: the row markup stays the same size whatever the depth
+        return mark_safe(f'<span style="padding-left:{level}em">{escape(obj.name)}</span>')
 
     @admin.display(description=_('Parent Group'), ordering='parent_group__name')
     def parent_group_link(self, obj):
-        """Display parent group name as a link."""
-        if obj.parent_group:
-            from django.urls import reverse
-            url = reverse('admin:crp_accounting_accountgroup_change', args=[obj.parent_group.pk])
-            return format_html('<a href="{}">{}</a>', url, obj.parent_group.name)
+        """Display parent group name as a link (uses the queryset annotations)."""
+        if obj.parent_pk:
+            url = change_url_template('admin:crp_accounting_accountgroup_change').format(obj.parent_pk)
+            return mark_safe(f'<a href="{url}">{escape(obj.parent_name)}</a>')
         return '-'
 
 
@@ -152,6 +164,8 @@ class AccountAdmin(admin.ModelAdmin):
     list_select_related = ('account_group',)
     actions = ['make_active', 'make_inactive']
     list_per_page = 25
+    # Account has no Meta.ordering: list (and autocomplete) accounts by group, then number
+    ordering = ('account_group__name', 'account_number')
 
     fieldsets = (
         (None, { # Main identification
@@ -177,6 +191,13 @@ class AccountAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        """Skip the description text columns on the changelist (not displayed there)."""
+        qs = super().get_queryset(request)
+        if is_changelist_request(request, self):
+            qs = qs.defer('description', 'account_group__description')
+        return qs
+
     def get_readonly_fields(self, request, obj=None):
         """Prevent editing account_number after creation."""
         ro_fields = list(self.readonly_fields)
@@ -188,9 +209,11 @@ class AccountAdmin(admin.ModelAdmin):
     @admin.action(description=_('Mark selected accounts as active'))
     def make_active(self, request, queryset):
         count = queryset.update(is_active=True)
+        clear_control_account_pks() # update() sends no post_save
         self.message_user(request, f"{count} account(s) marked as active.")
 
     @admin.action(description=_('Mark selected accounts as inactive'))
     def make_inactive(self, request, queryset):
         count = queryset.update(is_active=False)
+        clear_control_account_pks() # update() sends no post_save
         self.message_user(request, f"{count} account(s) marked as inactive.")
\ No newline at end of file
@@ -1,11 +1,32 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.contrib import admin
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, Substr
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.utils.html import format_html # For custom display methods
-from django.urls import reverse # For links
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
 from ..models.journal import (
     Voucher, VoucherLine, VoucherSequence, VoucherApproval,
     TransactionStatus # Import status enum for checks
 )
+from crp_core.enums import DrCrType
+from .utils import CachedCountPaginator, change_url_template, is_changelist_request
+
+
+# Statuses in which a voucher (and its lines) can no longer be edited
+_LOCKED_STATUSES = frozenset({TransactionStatus.POSTED, TransactionStatus.CANCELLED})
+
+# Read-only field sets, computed once at import instead of on every request
+_VOUCHER_ALWAYS_READONLY = ('voucher_number', 'created_at', 'updated_at', 'balances_updated')
+_VOUCHER_LOCKED_READONLY = _VOUCHER_ALWAYS_READONLY + (
+    'date', 'effective_date', 'reference', 'narration', 'voucher_type',
+    'status', 'party', 'accounting_period', 'content_type', 'object_id',
+)
+_VOUCHER_APPROVAL_READONLY = tuple(field.name for field in VoucherApproval._meta.fields)
 
 
 # =============================================================================
@@ -25,6 +46,10 @@ class VoucherLineInline(admin.TabularInline):
     # Define classes for styling if needed
     classes = ['collapse'] # Start collapsed by default if desired
 
+    def get_queryset(self, request):
+        """Load each line's account in the same query (labels for the autocomplete widgets)."""
+        return super().get_queryset(request).select_related('account')
+
     def get_readonly_fields(self, request, obj=None):
         """Make lines read-only if the parent voucher is posted/cancelled."""
         readonly = super().get_readonly_fields(request, obj)
@@ -39,18 +64,86 @@ class VoucherLineInline(admin.TabularInline):
     def has_add_permission(self, request, obj=None):
         """Prevent adding lines if the parent voucher is posted/cancelled."""
         # obj here is the PARENT Voucher instance passed from VoucherAdmin
-        if obj and obj.status in [TransactionStatus.POSTED, TransactionStatus.CANCELLED]:
+        if obj and obj.status in _LOCKED_STATUSES:
             return False
         return super().has_add_permission(request, obj)
 
     def has_delete_permission(self, request, obj=None):
         """Prevent deleting lines if the parent voucher is posted/cancelled."""
         # obj here is the PARENT Voucher instance passed from VoucherAdmin
-        if obj and obj.status in [TransactionStatus.POSTED, TransactionStatus.CANCELLED]:
+        if obj and obj.status in _LOCKED_STATUSES:
             return False
         return super().has_delete_permission(request, obj)
 
 
+# =============================================================================
+# List Filters
+# =============================================================================
+
+class VoucherDateFilter(admin.SimpleListFilter):
+    """
+    Quick date ranges for the voucher changelist.
+    Fixed lookups, so rendering the sidebar runs no per-choice queries.
+    """
+    title = _('date')
+    parameter_name = 'date_range'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('today', _('Today')),
+            ('7d', _('Past 7 days')),
+            ('mtd', _('This month')),
+            ('ytd', _('This year')),
+        )
+
+    def queryset(self, request, queryset):
+        today = timezone.localdate()
+        value = self.value()
+        if value == 'today':
+            return queryset.filter(date=today)
+        if value == '7d':
+            return queryset.filter(date__gt=today - timedelta(days=7), date__lte=today)
+        if value == 'mtd':
+            return queryset.filter(date__gte=today.replace(day=1), date__lte=today)
+        if value == 'ytd':
+            return queryset.filter(date__gte=today.replace(month=1, day=1), date__lte=today)
+        return queryset
+
+
+class PartyFilter(admin.SimpleListFilter):
+    """
+    Text input filter on party name.
+    Replaces the plain 'party' filter, which listed every party in the sidebar.
+    """
+    title = _('party')
+    parameter_name = 'party_name'
+    template = 'admin/crp_accounting/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return () # No sidebar choices; the template renders a text input
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or '').strip()
+        if value:
+            return queryset.filter(party__name__icontains=value)
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.value(),
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': _('All'),
+            # Other active filters/search, re-submitted with the text input
+            'hidden_params': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.parameter_name
+            ],
+        }
+
+
 # =============================================================================
 # Main Voucher Admin
 # =============================================================================
@@ -70,8 +163,8 @@ class VoucherAdmin(admin.ModelAdmin):
         'status',
         'party_link', # Use custom method for link
         'narration_short', # Custom method for truncated narration
-        'total_debit',
-        'total_credit',
+        'total_debit_display', # Read from queryset annotation
+        'total_credit_display', # Read from queryset annotation
         'is_balanced_display', # Custom method for icon/text
         'accounting_period',
         'updated_at',
@@ -80,23 +173,22 @@ class VoucherAdmin(admin.ModelAdmin):
         'status',
         'voucher_type',
         'accounting_period',
-        ('date', admin.DateFieldListFilter), # Use date filter
-        'party',
+        VoucherDateFilter, # Fixed date ranges (no per-choice queries)
+        PartyFilter, # Text input instead of one sidebar link per party
     )
-    search_fields = (
-        'voucher_number',
-        'reference',
-        'narration',
-        'party__name', # Search related Party name
-        'lines__narration', # Search line narrations
-        'lines__account__account_name', # Search line account names
-        'lines__account__account_code', # Search line account codes
-    )
-    date_hierarchy = 'date' # Allows quick date drill-down
+    # search_blob denormalizes voucher number, reference, narration, party name and
+    # line narration/account name/number (trigram-indexed on PostgreSQL), so searching
+    # no longer JOINs lines, accounts and parties.
+    search_fields = ('search_blob',)
+    # No date_hierarchy: its MIN/MAX + DISTINCT dates queries ran on every page load;
+    # VoucherDateFilter covers the common date ranges.
     ordering = ('-date', '-voucher_number') # Default ordering in admin list
     inlines = [VoucherLineInline] # Embed the line editor
     # Use autocomplete for foreign keys with many options
     autocomplete_fields = ['party', 'accounting_period'] # Requires setup in PartyAdmin/PeriodAdmin
+    # Large table: cache unfiltered counts and skip the extra unfiltered COUNT(*)
+    paginator = CachedCountPaginator
+    show_full_result_count = False
 
     # Define fieldsets for the detail/change view for better organization
     fieldsets = (
@@ -116,22 +208,39 @@ class VoucherAdmin(admin.ModelAdmin):
         # Note: Lines are handled by the inline, not listed in fieldsets
     )
 
+    def get_queryset(self, request):
+        """Annotate line totals so the changelist needs no per-row aggregate queries."""
+        qs = super().get_queryset(request)
+        if is_changelist_request(request, self):
+            # List rows only show a narration excerpt; skip the full text columns
+            qs = qs.defer('narration', 'search_blob').annotate(
+                narration_excerpt=Substr('narration', 1, 51)
+            )
+        return qs.select_related('party', 'accounting_period').annotate(
+            total_debit_ann=Coalesce(
+                Sum('lines__amount', filter=Q(lines__dr_cr=DrCrType.DEBIT.value)), Decimal('0.00')
+            ),
+            total_credit_ann=Coalesce(
+                Sum('lines__amount', filter=Q(lines__dr_cr=DrCrType.CREDIT.value)), Decimal('0.00')
+            ),
+        )
+
+    def save_related(self, request, form, formsets, change):
+        """Saves the line inlines, then rebuilds the voucher's search_blob once."""
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_search_blob()
+
     def get_readonly_fields(self, request, obj=None):
         """
         Determine read-only fields based on voucher status.
         Posted or Cancelled vouchers should largely be read-only.
         """
-        readonly = ['voucher_number', 'created_at', 'updated_at', 'balances_updated'] # Always read-only
-        if obj: # If viewing/editing an existing voucher
-            if obj.status in [TransactionStatus.POSTED, TransactionStatus.CANCELLED]:
-                # Make most fields read-only for posted/cancelled vouchers
-                readonly.extend([
-                    'date', 'effective_date', 'reference', 'narration', 'voucher_type',
-                    'status', 'party', 'accounting_period', 'content_type', 'object_id'
-                ])
+        if obj and obj.status in _LOCKED_STATUSES:
+            # Make most fields read-only for posted/cancelled vouchers
+            return _VOUCHER_LOCKED_READONLY
         # Allow setting status only on create? For admin, might allow changing DRAFT/REJECTED
         # For now, status is read-only if posted/cancelled via the check above.
-        return readonly
+        return _VOUCHER_ALWAYS_READONLY
 
     # --- Custom display methods for list_display ---
 
@@ -139,32 +248,44 @@ class VoucherAdmin(admin.ModelAdmin):
     def voucher_number_link(self, obj):
         """Make voucher number a link to the change view."""
         if obj.voucher_number:
-            url = reverse('admin:crp_accounting_voucher_change', args=[obj.pk])
-            return format_html('<a href="{}">{}</a>', url, obj.voucher_number)
+            url = change_url_template('admin:crp_accounting_voucher_change').format(obj.pk)
+            return mark_safe(f'<a href="{url}">{escape(obj.voucher_number)}</a>')
         return _('(Not Assigned)')
 
     @admin.display(description=_('Party'), ordering='party__name')
     def party_link(self, obj):
         """Make party a link to the Party change view (if applicable)."""
         if obj.party:
-            # Assuming you have a PartyAdmin registered under app 'crp_core' or similar
-            try:
-                url = reverse('admin:crp_core_party_change', args=[obj.party.pk]) # Adjust app_label if needed
-                return format_html('<a href="{}">{}</a>', url, obj.party)
-            except Exception: # Catch NoReverseMatch if Party admin not setup
+            url_template = change_url_template('admin:crp_accounting_party_change')
+            if url_template is None: # Party admin not registered
                 return str(obj.party)
+            return mark_safe(f'<a href="{url_template.format(obj.party_id)}">{escape(obj.party)}</a>')
         return '-'
 
     @admin.display(description=_('Narration'))
     def narration_short(self, obj):
         """Display a shortened version of the narration."""
-        from django.utils.text import Truncator
-        return Truncator(obj.narration).chars(50, truncate='...')
+        # 51 chars from SQL are enough for Truncator to decide whether to add '...'
+        narration = getattr(obj, 'narration_excerpt', None)
+        if narration is None:
+            narration = obj.narration
+        return Truncator(narration).chars(50, truncate='...')
+
+    @admin.display(description=_('Total Debit'), ordering='total_debit_ann')
+    def total_debit_display(self, obj):
+        """Total of debit lines (annotated in get_queryset)."""
+        return obj.total_debit_ann
+
+    @admin.display(description=_('Total Credit'), ordering='total_credit_ann')
+    def total_credit_display(self, obj):
+        """Total of credit lines (annotated in get_queryset)."""
+        return obj.total_credit_ann
 
     @admin.display(description=_('Balanced?'), boolean=True)
     def is_balanced_display(self, obj):
-        """Display a boolean icon for the is_balanced property."""
-        return obj.is_balanced
+        """Same rule as Voucher.is_balanced, evaluated on the annotated totals."""
+        debit = obj.total_debit_ann
+        return debit > 0 and debit.quantize(Decimal('0.01')) == obj.total_credit_ann.quantize(Decimal('0.01'))
 
     # Optional: Add admin actions to perform workflow steps (use with caution!)
     # actions = ['submit_selected_vouchers', 'approve_selected_vouchers']
@@ -190,7 +311,8 @@ class VoucherSequenceAdmin(admin.ModelAdmin):
     list_display = ('voucher_type', 'accounting_period', 'prefix', 'padding_digits', 'last_number', 'updated_at')
     list_filter = ('voucher_type', 'accounting_period')
     search_fields = ('prefix', 'accounting_period__name')
-    list_editable = ('prefix', 'padding_digits') # Allow quick edits in list view
+    # No list_editable: it built a ModelForm per row on every changelist load.
+    # Prefix/padding are edited on the change page.
     list_per_page = 25
     ordering = ('accounting_period__start_date', 'voucher_type')
     # Make last_number read-only to prevent accidental manual changes? Or editable for corrections?
@@ -206,15 +328,28 @@ class VoucherApprovalAdmin(admin.ModelAdmin):
     """Admin configuration for viewing Voucher Approval logs (read-only)."""
     list_display = ('voucher_link', 'user', 'action_type', 'action_timestamp', 'from_status', 'to_status', 'comments_short')
     list_filter = ('action_type', 'user', ('action_timestamp', admin.DateFieldListFilter))
-    search_fields = ('voucher__voucher_number', 'user__username', 'comments')
+    search_fields = ('voucher__voucher_number', 'user__email', 'comments') # accounts.User has no username
     list_per_page = 50
+    list_select_related = ('voucher', 'user')
     ordering = ('-action_timestamp',)
     autocomplete_fields = ['voucher', 'user']
+    # Append-only log that grows without bound: same count caching as VoucherAdmin
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Join voucher and user for the link/user columns; list rows load only the shown columns."""
+        qs = super().get_queryset(request).select_related('voucher', 'user')
+        if is_changelist_request(request, self):
+            qs = qs.only(
+                'id', 'voucher_id', 'voucher__voucher_number', 'user_id', 'user__email',
+                'action_type', 'action_timestamp', 'from_status', 'to_status', 'comments',
+            )
+        return qs
 
     def get_readonly_fields(self, request, obj=None):
         """Make all fields read-only as this is a log."""
-        # Dynamically get all fields from the model
-        return [field.name for field in self.model._meta.fields]
+        return _VOUCHER_APPROVAL_READONLY
 
     def has_add_permission(self, request):
         """Prevent adding logs manually via admin."""
@@ -233,14 +368,14 @@ class VoucherApprovalAdmin(admin.ModelAdmin):
     def voucher_link(self, obj):
         """Link to the related voucher."""
         if obj.voucher:
-            url = reverse('admin:crp_accounting_voucher_change', args=[obj.voucher.pk])
-            return format_html('<a href="{}">{}</a>', url, obj.voucher.voucher_number or f"Voucher #{obj.voucher.pk}")
+            url = change_url_template('admin:crp_accounting_voucher_change').format(obj.voucher_id)
+            label = obj.voucher.voucher_number or f"Voucher #{obj.voucher_id}"
+            return mark_safe(f'<a href="{url}">{escape(label)}</a>')
         return '-'
 
     @admin.display(description=_('Comments'))
     def comments_short(self, obj):
         """Display shortened comments."""
-        from django.utils.text import Truncator
         return Truncator(obj.comments).chars(50, truncate='...')
 
 # from django.contrib import admin
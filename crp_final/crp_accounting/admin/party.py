@@ -1,20 +1,87 @@
 # crp_accounting/admin.py
 
+import logging
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, PAGE_VAR, ChangeList
 from django.db import models # For potential filtering if needed
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal, InvalidOperation
 
-from crp_accounting.models import Party, Account
+from crp_accounting.models import Party, PartyBalanceCache, Account
+from crp_accounting.models.coa import control_account_pks
 # --- Model and Enum Imports ---
 # Make sure these imports are correct based on your project structure
  # Need Account model for filtering queryset
 from crp_core.enums import PartyType # Need PartyType enum for filtering
+from crp_core.enums import AccountNature, DrCrType
+from .utils import EstimatedCountPaginator, is_changelist_request
 
 # Optional: If you want to filter by date ranges
 from django.contrib.admin import DateFieldListFilter
 
+logger = logging.getLogger(__name__)
+
+# Query-string flag that forces the balance column onto 'Show all' / later pages
+BALANCE_OPT_IN_VAR = '_balance'
+
+# Balance column rendering: symbol lookup + one str.format per row.
+# All inputs are constants or a Decimal, so no escaping is needed.
+_CURRENCY_SYMBOLS = {'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£'}
+_BALANCE_TEMPLATE = '<span style="color: {};">{}{:,.2f}</span>'
+# Zero balances are common and identical per currency: render them once
+_ZERO_BALANCE_HTML = {
+    code: mark_safe(_BALANCE_TEMPLATE.format('black', symbol, Decimal('0.00')))
+    for code, symbol in _CURRENCY_SYMBOLS.items()
+}
+_ZERO_BALANCE_DEFAULT_HTML = mark_safe(_BALANCE_TEMPLATE.format('black', '$', Decimal('0.00')))
+# Pre-rendered cells for the statuses returned by Party.get_credit_status()
+_CREDIT_STATUS_HTML = {
+    "Over Credit Limit": mark_safe('<span style="color: red;">Over Credit Limit</span>'),
+    "Within Limit": mark_safe('<span style="color: green;">Within Limit</span>'),
+    "N/A": mark_safe('<span style="color: grey;">N/A</span>'),
+}
+# Choice labels read directly by PartyAdmin.party_type_label
+_PARTY_TYPE_LABELS = dict(PartyType.choices)
+
+
+def outstanding_balance_expression():
+    """
+    SQL equivalent of Party.calculate_outstanding_balance() (lifetime balance) for
+    use in annotate(): sums the party's voucher lines posted to its control account,
+    signed by the control account's nature.
+    """
+    on_control_account = Q(vouchers__lines__account=F('control_account'))
+    debit = Coalesce(
+        Sum('vouchers__lines__amount', filter=on_control_account & Q(vouchers__lines__dr_cr=DrCrType.DEBIT.value)),
+        Decimal('0.00'),
+    )
+    credit = Coalesce(
+        Sum('vouchers__lines__amount', filter=on_control_account & Q(vouchers__lines__dr_cr=DrCrType.CREDIT.value)),
+        Decimal('0.00'),
+    )
+    return Case(
+        When(control_account__account_nature=AccountNature.CREDIT.value, then=credit - debit),
+        default=debit - credit,
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+
+
+class PartyChangeList(ChangeList):
+    """
+    Keeps ?_balance=1 in the pagination, sort and filter links (it stays in
+    self.params) without applying it to the queryset as a field lookup.
+    """
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(BALANCE_OPT_IN_VAR, None)
+        return lookup_params
+
+
 @admin.register(Party)
 class PartyAdmin(admin.ModelAdmin):
     """
@@ -28,7 +95,7 @@ class PartyAdmin(admin.ModelAdmin):
     """
     list_display = (
         'name',
-        'party_type',
+        'party_type_label',
         'control_account_link', # Display linked control account
         'is_active',
         'contact_phone',
@@ -42,6 +109,10 @@ class PartyAdmin(admin.ModelAdmin):
         ('control_account', admin.RelatedOnlyFieldListFilter), # Filter by assigned control account
         ('created_at', DateFieldListFilter),
     )
+    search_help_text = _(
+        "Balances are shown on the first page (or when sorted by balance) only; add "
+        "?_balance=1 to include them on later pages or with 'Show all'."
+    )
     search_fields = (
         'name',
         'contact_email',
@@ -49,7 +120,6 @@ class PartyAdmin(admin.ModelAdmin):
         'control_account__account_name', # Search by linked account name
         'control_account__account_number', # Search by linked account number
     )
-    list_select_related = ('control_account',) # Pre-fetch control account for display
     readonly_fields = (
         'created_at',
         'updated_at',
@@ -71,8 +141,68 @@ class PartyAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
-    autocomplete_fields = ['control_account'] # Good choice for potentially long account lists
+    raw_id_fields = ('control_account',) # Plain ID input: no choices or autocomplete requests on form load
     list_per_page = 25
+    # Large table: planner estimate (PostgreSQL) / cached count instead of COUNT(*) per page
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return PartyChangeList
+
+    def include_balance(self, request):
+        """
+        Whether the changelist computes the balance column (otherwise its cells show a
+        placeholder): first page only, unless ?_balance=1 asks for it with 'Show all' or
+        later pages. A list sorted by balance always computes it, so every page orders alike.
+        """
+        if self.sorts_by_balance(request):
+            return True
+        if BALANCE_OPT_IN_VAR in request.GET:
+            return request.GET[BALANCE_OPT_IN_VAR] == '1'
+        if ALL_VAR in request.GET:
+            return False
+        try:
+            return int(request.GET.get(PAGE_VAR, 1)) <= 1
+        except ValueError:
+            return True
+
+    def sorts_by_balance(self, request):
+        """Whether ?o= refers to the balance column, counted as ChangeList counts columns."""
+        order = request.GET.get(ORDER_VAR)
+        if not order:
+            return False
+        columns = list(self.get_list_display(request))
+        if self.get_actions(request):
+            columns.insert(0, 'action_checkbox') # As get_changelist_instance() does
+        index = str(columns.index('display_calculated_balance'))
+        return any(part.rpartition('-')[2] == index for part in order.split('.'))
+
+    def get_queryset(self, request):
+        """Annotate the outstanding balance so the changelist needs no per-row balance queries."""
+        qs = super().get_queryset(request).select_related('control_account')
+        if is_changelist_request(request, self):
+            # Columns read by list_display, control_account.__str__ and get_credit_status()
+            qs = qs.only(
+                'id', 'name', 'party_type', 'is_active', 'contact_phone', 'credit_limit', 'control_account_id',
+                'control_account__account_name', 'control_account__account_number',
+                'control_account__account_nature', 'control_account__currency',
+            )
+        # Read from party_balance_cache (refreshed every few minutes on PostgreSQL) instead of
+        # aggregating voucher lines per page view; actions that need exact figures use
+        # outstanding_balance_expression().
+        balance = Coalesce(
+            Subquery(PartyBalanceCache.objects.filter(party=OuterRef('pk')).values('balance')[:1]),
+            Decimal('0.00'),
+        )
+        if is_changelist_request(request, self) and not self.include_balance(request):
+            # Balance column skipped: the credit status still needs it, but only for parties with a limit
+            return qs.annotate(credit_balance_ann=Case(
+                When(credit_limit__gt=0, control_account__isnull=False, then=balance),
+                default=None,
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            ))
+        return qs.annotate(outstanding_balance_ann=balance)
 
     # --- ADDED: Method to filter Control Account choices ---
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -84,54 +214,31 @@ class PartyAdmin(admin.ModelAdmin):
             # Try to get the party type of the object being edited
             object_id = request.resolver_match.kwargs.get('object_id')
             party_type = None
-            instance = None
             if object_id:
                 try:
-                    # Use get_queryset to respect admin filters if any future customization
-                    instance = self.get_queryset(request).filter(pk=object_id).first()
-                    if instance:
-                         party_type = instance.party_type
+                    # Only party_type is needed: skip the annotated/joined admin queryset
+                    party_type = Party.objects.filter(pk=object_id).values_list('party_type', flat=True).first()
                 except Exception as e:
                     # Log error or handle gracefully if needed
-                    print(f"Warning: Could not get Party instance {object_id} for filtering: {e}")
+                    logger.warning("Could not get Party %s for control account filtering: %s", object_id, e)
                     pass # Fallback to default filtering
 
-            # Apply filtering based on the determined party_type
-            if party_type == PartyType.CUSTOMER.value:
-                # Show only Customer control accounts if editing a Customer
-                kwargs["queryset"] = Account.objects.filter(
-                    is_control_account=True,
-                    control_account_party_type=PartyType.CUSTOMER.value,
-                    is_active=True # Also ensure the account is active
-                ).order_by('account_number')
-                self.message_user(request, "Showing Accounts Receivable control accounts.", level='info')
-            elif party_type == PartyType.SUPPLIER.value:
-                # Show only Supplier control accounts if editing a Supplier
-                kwargs["queryset"] = Account.objects.filter(
-                    is_control_account=True,
-                    control_account_party_type=PartyType.SUPPLIER.value,
-                    is_active=True
-                ).order_by('account_number')
-                self.message_user(request, "Showing Accounts Payable control accounts.", level='info')
-            else:
-                # When adding new OR if type is not Customer/Supplier
-                # Show all active Customer & Supplier control accounts by default
-                kwargs["queryset"] = Account.objects.filter(
-                    is_control_account=True,
-                    control_account_party_type__in=[
-                        PartyType.CUSTOMER.value,
-                        PartyType.SUPPLIER.value
-                    ],
-                    is_active=True
-                ).order_by('account_number')
-                # Optionally add a message if adding new
-                if not object_id:
-                     self.message_user(request, "Select the appropriate Control Account (Accounts Receivable for Customer, Accounts Payable for Supplier).", level='warning')
+            # Narrow the accepted accounts by party_type (PKs cached, see control_account_pks).
+            # raw_id_fields renders no choices, so this only affects validation.
+            kwargs["queryset"] = Account.objects.filter(
+                pk__in=control_account_pks(party_type)
+            ).order_by('account_number')
+            # Static guidance (formerly per-render message_user calls, which wrote to the session)
+            kwargs.setdefault("help_text", _("Accounts Receivable for Customer, Accounts Payable for Supplier."))
 
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
     # --- END ADDED METHOD ---
 
     # --- Custom Methods for Display (Your existing methods) ---
+    @admin.display(description='Type', ordering='party_type')
+    def party_type_label(self, obj):
+        return _PARTY_TYPE_LABELS.get(obj.party_type, obj.party_type)
+
     @admin.display(description='Control Account', ordering='control_account__account_name')
     def control_account_link(self, obj):
         """Displays the control account name as a link if it exists."""
@@ -139,17 +246,17 @@ class PartyAdmin(admin.ModelAdmin):
             return str(obj.control_account)
         return "N/A" # Changed from '-' for clarity
 
-    @admin.display(description='Current Balance', ordering=None)
+    @admin.display(description='Current Balance', ordering='outstanding_balance_ann')
     def display_calculated_balance(self, obj):
-        """Calculates and displays the current outstanding balance."""
-        # PERFORMANCE WARNING: This calculation runs for every row in list view.
+        """Displays the outstanding balance (annotated in get_queryset), or a placeholder when it was skipped."""
+        if not hasattr(obj, 'outstanding_balance_ann'):
+            return self.get_empty_value_display() # The column stays in place so ?o= indexes do not shift
         if not obj.control_account:
              return "N/A (No Control Acct)" # Cannot calculate without control account
         try:
-            # Assuming Party model has this method:
-            balance = obj.calculate_outstanding_balance()
-            currency_symbol = '₹' if obj.control_account.currency == 'INR' else '$' # Basic currency symbol
-            balance_str = f"{currency_symbol}{balance:,.2f}"
+            balance = obj.outstanding_balance_ann
+            if balance == 0:
+                return _ZERO_BALANCE_HTML.get(obj.control_account.currency, _ZERO_BALANCE_DEFAULT_HTML)
             # Basic coloring
             color = "red" if balance < 0 else "black"
             # More advanced coloring based on nature (requires control_account)
@@ -159,27 +266,28 @@ class PartyAdmin(admin.ModelAdmin):
             #     elif balance > 0 and obj.control_account.is_debit_nature(): color = "black" # Normal AR
             #     elif balance > 0 and obj.control_account.is_credit_nature(): color = "black" # Normal AP
 
-            return format_html('<span style="color: {};">{}</span>', color, balance_str)
-        except AttributeError:
-            return "N/A (Method Missing?)" # If calculate_outstanding_balance doesn't exist
-        except Exception as e:
+            currency_symbol = _CURRENCY_SYMBOLS.get(obj.control_account.currency, '$')
+            return mark_safe(_BALANCE_TEMPLATE.format(color, currency_symbol, balance))
+        except Exception:
              # Log the actual error for debugging
-             print(f"Error calculating balance for Party {obj.pk}: {e}")
+             logger.exception("Error calculating balance for Party %s", obj.pk)
              return "Calculation Error"
 
 
     @admin.display(description='Credit Status')
     def get_credit_status_display(self, obj):
-        """Displays the credit status based on the model method."""
-        # Assuming Party model has this method:
+        """Displays the credit status, from a balance annotated in get_queryset() when there is one."""
         try:
-            status = obj.get_credit_status()
-            color = "red" if status == "Over Credit Limit" else "green" if status == "Within Limit" else "grey"
-            return format_html('<span style="color: {};">{}</span>', color, status)
+            balance = getattr(obj, 'outstanding_balance_ann', getattr(obj, 'credit_balance_ann', None))
+            status = obj.get_credit_status(balance)
+            html = _CREDIT_STATUS_HTML.get(status)
+            if html is None: # Unknown status: render it escaped
+                html = format_html('<span style="color: grey;">{}</span>', status)
+            return html
         except AttributeError:
             return "N/A (Method Missing?)"
-        except Exception as e:
-             print(f"Error getting credit status for Party {obj.pk}: {e}")
+        except Exception:
+             logger.exception("Error getting credit status for Party %s", obj.pk)
              return "Error"
 
 
@@ -194,23 +302,18 @@ class PartyAdmin(admin.ModelAdmin):
     @admin.action(description='Mark selected parties as inactive')
     def make_inactive(self, request, queryset):
         active_parties = queryset.filter(is_active=True)
-        updated_count = 0
-        excluded_count = 0
-        for party in active_parties:
-            try:
-                 # Recalculate balance before deactivating
-                 if hasattr(party, 'calculate_outstanding_balance') and party.control_account and party.calculate_outstanding_balance() != Decimal('0.00'):
-                     self.message_user(request, f"Cannot deactivate party '{party.name}' due to non-zero balance.", level='warning')
-                     excluded_count += 1
-                 else:
-                     party.is_active = False
-                     party.save(update_fields=['is_active']) # Save individually after check
-                     updated_count += 1
-            except Exception as e:
-                 self.message_user(request, f"Error checking/deactivating party '{party.name}': {e}", level='error')
-                 excluded_count += 1
+        # One aggregate query finds the parties that still carry a balance...
+        blocked = list(
+            active_parties.filter(control_account__isnull=False)
+            .annotate(outstanding_balance_ann=outstanding_balance_expression())
+            .exclude(outstanding_balance_ann=Decimal('0.00'))
+            .values_list('pk', 'name')
+        )
+        # ...and one UPDATE deactivates the rest
+        updated_count = active_parties.exclude(pk__in=[pk for pk, _name in blocked]).update(is_active=False)
 
         if updated_count > 0:
              self.message_user(request, f"Marked {updated_count} parties as inactive.")
-        if excluded_count > 0:
-             self.message_user(request, f"Could not deactivate {excluded_count} parties (check warnings/errors).", level='warning')
\ No newline at end of file
+        if blocked:
+             names = ", ".join(f"'{name}'" for _pk, name in blocked)
+             self.message_user(request, f"Could not deactivate {len(blocked)} parties due to non-zero balance: {names}.", level='warning')
@@ -1,9 +1,14 @@
 from django.contrib import admin, messages
-from django.utils.html import format_html
+from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
 from crp_accounting.models.period import FiscalYear, AccountingPeriod
+from .utils import CachedCountPaginator
 
+# Static status cells for AccountingPeriodAdmin.lock_unlock_action
+_LOCKED_HTML = mark_safe('<span style="color:red;">🔒 Locked</span>')
+_OPEN_HTML = mark_safe('<span style="color:green;">🔓 Open</span>')
 
 @admin.register(FiscalYear)
 class FiscalYearAdmin(admin.ModelAdmin):
@@ -11,87 +16,58 @@ class FiscalYearAdmin(admin.ModelAdmin):
     list_filter = ("status", "is_active")
     search_fields = ("name",)
     readonly_fields = ("closed_by", "closed_at", "created_at", "updated_at")
+    paginator = CachedCountPaginator
+    show_full_result_count = False
 
     actions = ["activate_fiscal_year", "close_fiscal_year"]
 
+    @admin.action(description="Activate selected fiscal year")
     def activate_fiscal_year(self, request, queryset):
-        if queryset.count() != 1:
+        selected = list(queryset[:2]) # One query: enough rows to tell "exactly one" apart
+        if len(selected) != 1:
             self.message_user(request, _("Please select only one fiscal year to activate."), level=messages.WARNING)
             return
 
-        year = queryset.first()
+        year = selected[0]
         year.activate()
         self.message_user(request, _(f"Fiscal Year '{year.name}' has been activated."), level=messages.SUCCESS)
 
-    activate_fiscal_year.short_description = "Activate selected fiscal year"
-
+    @admin.action(description="Close selected fiscal years")
     def close_fiscal_year(self, request, queryset):
-        for year in queryset:
-            if year.status == "Closed":
-                self.message_user(request, _(f"Fiscal Year '{year.name}' is already closed."), level=messages.WARNING)
-                continue
-
-            year.close_year(user=request.user)
-            self.message_user(request, _(f"Fiscal Year '{year.name}' has been closed."), level=messages.SUCCESS)
+        # Same field changes as FiscalYear.close_year(), as a single UPDATE
+        skipped = queryset.filter(status="Closed").count()
+        now = timezone.now()
+        updated = queryset.exclude(status="Closed").update(
+            status="Closed", closed_by=request.user, closed_at=now, updated_at=now
+        )
+        if updated:
+            self.message_user(request, _(f"{updated} fiscal year(s) closed."), level=messages.SUCCESS)
+        if skipped:
+            self.message_user(request, _(f"{skipped} fiscal year(s) were already closed."), level=messages.WARNING)
 
-    close_fiscal_year.short_description = "Close selected fiscal years"
 
 @admin.register(AccountingPeriod)
 class AccountingPeriodAdmin(admin.ModelAdmin):
     list_display = ("fiscal_year", "start_date", "end_date", "locked", "lock_unlock_action")
     list_filter = ("fiscal_year", "locked")
     search_fields = ("fiscal_year__name", "start_date", "end_date")  # 👈 this line is crucial
+    raw_id_fields = ("fiscal_year",)
+    paginator = CachedCountPaginator
+    show_full_result_count = False
 
     actions = ["lock_selected_periods", "unlock_selected_periods"]
 
+    @admin.display(description="Status")
     def lock_unlock_action(self, obj):
-        if obj.locked:
-            return format_html('<span style="color:red;">🔒 Locked</span>')
-        return format_html('<span style="color:green;">🔓 Open</span>')
-
-    lock_unlock_action.short_description = "Status"
-
-    def lock_selected_periods(self, request, queryset):
-        updated = 0
-        for period in queryset:
-            if not period.locked:
-                period.lock()
-                updated += 1
-        self.message_user(request, _(f"{updated} accounting period(s) locked."), level=messages.SUCCESS)
-
-    def unlock_selected_periods(self, request, queryset):
-        updated = 0
-        for period in queryset:
-            if period.locked:
-                period.unlock()
-                updated += 1
-        self.message_user(request, _(f"{updated} accounting period(s) unlocked."), level=messages.SUCCESS)
-
-    actions = ["lock_selected_periods", "unlock_selected_periods"]
-
-    def lock_unlock_action(self, obj):
-        if obj.locked:
-            return format_html('<span style="color:red;">🔒 Locked</span>')
-        return format_html('<span style="color:green;">🔓 Open</span>')
-
-    lock_unlock_action.short_description = "Status"
+        return _LOCKED_HTML if obj.locked else _OPEN_HTML
 
+    @admin.action(description="Lock selected accounting periods")
     def lock_selected_periods(self, request, queryset):
-        updated = 0
-        for period in queryset:
-            if not period.locked:
-                period.lock()
-                updated += 1
+        # Single UPDATE; AccountingPeriod.lock_period() only flips the flag and saves
+        updated = queryset.filter(locked=False).update(locked=True)
         self.message_user(request, _(f"{updated} accounting period(s) locked."), level=messages.SUCCESS)
 
-    lock_selected_periods.short_description = "Lock selected accounting periods"
-
+    @admin.action(description="Unlock selected accounting periods")
     def unlock_selected_periods(self, request, queryset):
-        updated = 0
-        for period in queryset:
-            if period.locked:
-                period.unlock()
-                updated += 1
+        updated = queryset.filter(locked=True).update(locked=False)
         self.message_user(request, _(f"{updated} accounting period(s) unlocked."), level=messages.SUCCESS)
-
-    unlock_selected_periods.short_description = "Unlock selected accounting periods"
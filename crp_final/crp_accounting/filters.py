@@ -3,6 +3,8 @@
 import django_filters
 from django.db.models import Q # For complex lookups if needed
 from .models.journal import Voucher, VoucherType, TransactionStatus, Party, AccountingPeriod
+from .models.coa import Account
+from crp_core.enums import AccountNature
 
 class VoucherFilterSet(django_filters.FilterSet):
     """
@@ -45,4 +47,26 @@ class VoucherFilterSet(django_filters.FilterSet):
             'accounting_period',
             # Add other exact match fields if needed
         ]
-        # Note: More specific filters defined above override these defaults if names match.
\ No newline at end of file
+        # Note: More specific filters defined above override these defaults if names match.
+
+
+class AccountFilterSet(django_filters.FilterSet):
+    """
+    FilterSet for the Account model.
+    account_nature is a database-generated column, which django-filter cannot
+    derive a filter for, so it is declared explicitly.
+    """
+    account_nature = django_filters.ChoiceFilter(choices=AccountNature.choices)
+
+    class Meta:
+        model = Account
+        fields = {
+            'account_group': ['exact'],
+            'account_group__name': ['exact', 'icontains'],
+            'account_type': ['exact', 'in'], # Allow filtering by multiple types
+            'currency': ['exact'],
+            'is_active': ['exact'],
+            'allow_direct_posting': ['exact'],
+            'is_control_account': ['exact'],
+            'control_account_party_type': ['exact', 'isnull'],
+        }
@@ -1,12 +1,20 @@
 # crp_accounting/management/commands/seed_coa.py
 import logging
+import re
+import sys
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
+from operator import attrgetter
+from types import MappingProxyType
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction, IntegrityError, models
+from django.db import transaction, IntegrityError
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 # --- Project-Specific Imports ---
 try:
-    from crp_accounting.models.coa import AccountGroup, Account, PLSection # <<< ADDED PLSection Import
+    from crp_accounting.models.coa import AccountGroup, Account, PLSection, clear_control_account_pks # <<< ADDED PLSection Import
     from crp_core.constants import ACCOUNT_NATURE, ACCOUNT_ROLE_GROUPS
     from crp_core.enums import AccountType, AccountNature, PartyType, CurrencyType
 except ImportError as e:
@@ -17,15 +25,32 @@ except AttributeError as e:
 
 logger = logging.getLogger(__name__)
 
+# Default rows per INSERT/UPDATE statement for the bulk writes (--batch-size);
+# ~1000 suits PostgreSQL, ~500 is the usual choice on MySQL
+BULK_BATCH_SIZE = 1000
+
+# Account columns owned by the seed: written on insert, on conflict and on update
+ACCOUNT_SEED_FIELDS = [
+    'account_name', 'account_group', 'account_type', 'currency', 'pl_section',
+    'description', 'allow_direct_posting', 'is_active', 'is_control_account', 'control_account_party_type',
+]
+# Same columns as instance attributes (FK by id), and a getter for an account's current seed state
+ACCOUNT_SEED_ATTRS = tuple('account_group_id' if field == 'account_group' else field for field in ACCOUNT_SEED_FIELDS)
+_account_seed_state = attrgetter(*ACCOUNT_SEED_ATTRS)
+
 # --- Helper Function ---
+# Separators after which a constant key only qualifies its primary concept
+_PRIMARY_SEP = re.compile(r' - | \(| / ')
+
+@lru_cache(maxsize=None) # Pure function of a constant key; called for every group key on each pass
 def get_primary_group_name(constant_key):
     """Extracts the primary concept (Assets, Liabilities, etc.) from the constant key."""
-    return constant_key.split(' - ')[0].split(' (')[0].split(' / ')[0].strip()
+    return _PRIMARY_SEP.split(constant_key, maxsplit=1)[0].strip()
 
 # --- Derived Mappings ---
 
-# Map primary group concepts to AccountType enum members
-GROUP_CONCEPT_TO_ACCOUNT_TYPE = {
+# Map primary group concepts to AccountType enum members (read-only)
+GROUP_CONCEPT_TO_ACCOUNT_TYPE = MappingProxyType({
     'Assets': AccountType.ASSET,
     'Liabilities': AccountType.LIABILITY,
     'Equity': AccountType.EQUITY,
@@ -36,7 +61,7 @@ GROUP_CONCEPT_TO_ACCOUNT_TYPE = {
     'Taxation': AccountType.LIABILITY, # Assuming Taxation group holds liability accounts like "VAT Payable"
     'Receivables': AccountType.ASSET,
     'Payables': AccountType.LIABILITY,
-}
+})
 
 # --- *** NEW MAPPING: Account Type to Default P&L Section *** ---
 # This provides a baseline. Specific accounts can override this if needed.
@@ -51,6 +76,26 @@ ACCOUNT_TYPE_TO_DEFAULT_PL_SECTION = {
 }
 # --- *** END NEW MAPPING *** ---
 
+# Name-based P&L section overrides per AccountType: first matching substring
+# (checked against the lowercased account name) wins over the default above.
+PL_OVERRIDES = {
+    AccountType.EXPENSE: [
+        ('tax', PLSection.TAX_EXPENSE),
+        ('interest expense', PLSection.OTHER_EXPENSE), # Be specific
+    ],
+    AccountType.INCOME: [
+        ('interest income', PLSection.OTHER_INCOME), # Be specific
+    ],
+}
+
+
+def classify_pl_section(account_type, name_lower, default):
+    """Returns the P&L section for an account, applying PL_OVERRIDES to its lowercased name."""
+    for needle, section in PL_OVERRIDES.get(account_type, ()):
+        if needle in name_lower:
+            return section
+    return default
+
 # --- Revised Nature Mapping Derivation ---
 ACCOUNT_TYPE_TO_NATURE_NAME = {
     AccountType.ASSET: AccountNature.DEBIT.name,
@@ -73,141 +118,254 @@ CONTROL_ACCOUNTS_MAP = {
 }
 
 
+def _compile_accounts():
+    """
+    Flattens ACCOUNT_ROLE_GROUPS into one row per account:
+    (account_code, account_name, group_key, account_type_value, pl_section_value),
+    all enum-derived fields already resolved to their stored values,
+    with codes interned for the CONTROL_ACCOUNTS_MAP / preload dict lookups.
+    Stripping, P&L classification and the group-level lookups (primary-name split,
+    account type, default P&L section) run once at import, not on every seed.
+    Also returns the group keys whose AccountType cannot be determined; their
+    accounts are left out.
+    """
+    rows, untyped_group_keys = [], []
+    for group_key, roles in ACCOUNT_ROLE_GROUPS.items():
+        account_type_member = GROUP_CONCEPT_TO_ACCOUNT_TYPE.get(get_primary_group_name(group_key))
+        if not account_type_member:
+            untyped_group_keys.append(group_key)
+            continue
+        default_pl_section_member = ACCOUNT_TYPE_TO_DEFAULT_PL_SECTION.get(account_type_member, PLSection.NONE)
+        account_type_value = account_type_member.value
+        for code, name in roles:
+            name = name.strip()
+            pl_section_value = classify_pl_section(account_type_member, name.lower(), default_pl_section_member).value
+            rows.append((sys.intern(code.strip()), name, group_key, account_type_value, pl_section_value))
+    return rows, untyped_group_keys
+
+
+_COMPILED_ACCOUNTS, _UNTYPED_GROUP_KEYS = _compile_accounts()
+SEED_CURRENCY_VALUE = CurrencyType.INR.value # Currency of every seeded account
+
+
 class Command(BaseCommand):
     """
     Seeds/Updates the Chart of Accounts structure including P&L sections.
-    Idempotent using update_or_create.
+    Idempotent: groups are bulk-upserted by name, accounts are diffed against
+    the existing rows and written with bulk_create/bulk_update.
     """
     help = 'Seeds or updates the database with the default Chart of Accounts structure and P&L sections.'
 
-    @transaction.atomic
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Run the whole seed and report the counts, then roll the transaction back.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BULK_BATCH_SIZE,
+            help=f'Rows per bulk INSERT/UPDATE statement (default: {BULK_BATCH_SIZE}).',
+        )
+
+    def _write_accounts(self, to_create, to_update, now, batch_size):
+        """Flushes the account batches built by handle()."""
+        # ON CONFLICT keeps the insert idempotent if another seed run added the row since the preload
+        Account.objects.bulk_create(
+            to_create, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['account_number'], update_fields=[*ACCOUNT_SEED_FIELDS, 'updated_at'],
+        )
+        # Accounts sharing the same changes (e.g. after a constants edit) get one plain
+        # UPDATE ... WHERE id IN (...); only one-off changes use bulk_update's CASE WHEN.
+        one_off, one_off_fields = [], {'updated_at'}
+        for changed_fields, accounts in to_update.items():
+            if len(accounts) > 1:
+                Account.objects.filter(pk__in=[a.pk for a in accounts]).update(updated_at=now, **dict(changed_fields))
+            else:
+                accounts[0].updated_at = now # bulk_update() does not apply auto_now
+                one_off.extend(accounts)
+                one_off_fields.update(attr for attr, _ in changed_fields)
+        if one_off:
+            Account.objects.bulk_update(one_off, fields=list(one_off_fields), batch_size=batch_size)
+        clear_control_account_pks() # Bulk writes send no post_save
+
+    def _find_failing_accounts(self, accounts):
+        """
+        Re-saves each account of a failed batch in its own savepoint (rolled back
+        either way) and returns (account, error) for the rows that fail.
+        """
+        failures = []
+        for account_obj in accounts:
+            try:
+                with transaction.atomic():
+                    account_obj.save()
+                    transaction.set_rollback(True)
+            except (IntegrityError, ValidationError) as e:
+                failures.append((account_obj, e))
+        return failures
+
+    def _sync_groups(self, rows, existing_groups, progress, batch_size):
+        """
+        Upserts (name, parent_group_id) rows that are missing or differ from
+        existing_groups, in a single INSERT ... ON CONFLICT DO UPDATE.
+        Per-group lines are appended to progress (a list, or None when not verbose).
+        Returns ({name: AccountGroup}, created, updated, skipped).
+        """
+        groups, to_upsert = {}, []
+        created = updated = skipped = 0
+        for name, parent_id in rows:
+            # bulk_create() skips AccountGroup.save(), so depth is set here (the seed is two levels deep)
+            depth = 0 if parent_id is None else 1
+            group = existing_groups.get(name)
+            if group is not None and group.parent_group_id == parent_id and group.depth == depth:
+                groups[name] = group
+                skipped += 1
+                continue
+            if group is None:
+                created += 1
+                if progress is not None: progress.append(f"  [GROUP] Created group: '{name}'")
+            else:
+                updated += 1
+                if progress is not None: progress.append(f"  [GROUP] Updated group: '{name}'")
+            to_upsert.append(AccountGroup(name=name, parent_group_id=parent_id, depth=depth))
+
+        if to_upsert:
+            try:
+                AccountGroup.objects.bulk_create(
+                    to_upsert, batch_size=batch_size, update_conflicts=True, unique_fields=['name'],
+                    update_fields=['parent_group', 'depth', 'updated_at'],
+                )
+            except IntegrityError as e:
+                raise CommandError(f"Account group upsert failed, no changes were saved: {e}")
+            # Re-read the written rows for their primary keys
+            groups.update(AccountGroup.objects.in_bulk([group.name for group in to_upsert], field_name='name'))
+        return groups, created, updated, skipped
+
+    @transaction.atomic # The only transaction: bulk writes add no per-row savepoints
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('--- Starting Chart of Accounts Seeding/Update ---'))
+        # Per-group progress lines only with -v 2+, buffered and written in one go; summary always
+        progress = [] if options.get('verbosity', 1) >= 2 else None
+        batch_size = options.get('batch_size', BULK_BATCH_SIZE)
+        if batch_size < 1:
+            raise CommandError(f"--batch-size must be a positive integer, got {batch_size}.")
+        logger.info("seed_coa: bulk writes use batch_size=%d", batch_size)
         created_groups_count, updated_groups_count, skipped_groups_count = 0, 0, 0
         created_accounts_count, updated_accounts_count, skipped_accounts_count = 0, 0, 0
-        group_objects_map = {}
-
-        # --- Group Creation Loop ---
-        for group_name_from_constant, roles in ACCOUNT_ROLE_GROUPS.items():
-            self.stdout.write(f"\nProcessing Constant Group: '{group_name_from_constant}'")
-
-            primary_name = get_primary_group_name(group_name_from_constant)
-            parent_group_obj = group_objects_map.get(primary_name)
-
-            # Create/Get Primary Group
-            if not parent_group_obj:
-                group_defaults = {'parent_group': None}
-                try:
-                    parent_group_obj, created = AccountGroup.objects.update_or_create(
-                        name=primary_name, defaults=group_defaults
-                    )
-                    group_objects_map[primary_name] = parent_group_obj
-                    if created: created_groups_count += 1; self.stdout.write(f"  [GROUP] Created primary: '{primary_name}'")
-                    else: skipped_groups_count += 1 # Assuming skipped means found/no update needed
-                except Exception as e:
-                    self.stderr.write(self.style.ERROR(f"  [ERROR] Failed create/update primary group '{primary_name}': {e}. Skipping."))
+
+        # --- Preload existing rows: one SELECT per table, then dict lookups ---
+        primary_names = {get_primary_group_name(k) for k in ACCOUNT_ROLE_GROUPS}
+        sub_group_names = set(ACCOUNT_ROLE_GROUPS) - primary_names # Keys like 'Equity' are their own primary group
+        # No select_related: the diff below reads parent_group_id / account_group_id only,
+        # so no related row is ever loaded per object.
+        existing_groups = AccountGroup.objects.in_bulk(primary_names | sub_group_names, field_name='name')
+        existing_accounts = Account.objects.in_bulk(field_name='account_number')
+
+        # --- Pass 1: primary groups (one upsert, top-level) ---
+        group_objects_map, *counts = self._sync_groups(
+            [(name, None) for name in sorted(primary_names)], existing_groups, progress, batch_size
+        )
+        # --- Pass 2: sub-groups (one upsert, parents resolved from pass 1) ---
+        sub_groups, *sub_counts = self._sync_groups(
+            [
+                (name, group_objects_map[get_primary_group_name(name)].pk)
+                for name in ACCOUNT_ROLE_GROUPS if name in sub_group_names
+            ],
+            existing_groups, progress, batch_size
+        )
+        group_objects_map.update(sub_groups)
+        created_groups_count, updated_groups_count, skipped_groups_count = (
+            primary + sub for primary, sub in zip(counts, sub_counts)
+        )
+
+        for group_key in _UNTYPED_GROUP_KEYS:
+            self.stderr.write(self.style.WARNING(f"  [WARN] Undetermined AccountType for primary concept '{get_primary_group_name(group_key)}'. Skipping accounts in '{group_key}'."))
+
+        # --- Pass 3: accounts (batched create/update) ---
+        # Diff against the preloaded rows, then bulk INSERT/UPDATE instead of an
+        # update_or_create (SELECT + INSERT/UPDATE) per account.
+        # A list, not a generator: bulk_create() materializes its input anyway, and the
+        # rows are needed again for the counts and failure diagnosis below.
+        to_create = []
+        to_update = defaultdict(list) # ((attr, new value), ...) -> accounts needing exactly those changes
+        now = timezone.now()
+
+        for account_code_clean, account_name_clean, group_key, account_type_value, pl_section_value in _COMPILED_ACCOUNTS:
+            control_party_type_name = CONTROL_ACCOUNTS_MAP.get(account_code_clean)
+            is_control = control_party_type_name is not None
+
+            # Desired values, in ACCOUNT_SEED_ATTRS order
+            new_state = (
+                account_name_clean,
+                group_objects_map[group_key].pk, # Compared by id: no related-object fetch
+                account_type_value, # Use .value for db choice (account_nature is derived from it by the database)
+                SEED_CURRENCY_VALUE,
+                pl_section_value, # <<< ADDED: Use .value for db choice
+                '', # description
+                True, # allow_direct_posting
+                True, # is_active
+                is_control,
+                control_party_type_name,
+            )
+
+            account_obj = existing_accounts.get(account_code_clean)
+            if account_obj is None:
+                account_obj = Account(account_number=account_code_clean, **dict(zip(ACCOUNT_SEED_ATTRS, new_state)))
+                changed_fields = None
+            else:
+                old_state = _account_seed_state(account_obj)
+                if old_state == new_state: # Steady-state re-runs: nothing to write
+                    skipped_accounts_count += 1
                     continue
+                changed_fields = tuple(
+                    (attr, new_value)
+                    for attr, old_value, new_value in zip(ACCOUNT_SEED_ATTRS, old_state, new_state)
+                    if old_value != new_value
+                )
+                for attr, new_value in changed_fields:
+                    setattr(account_obj, attr, new_value)
 
-            # Create/Update Specific Group
-            sub_group_defaults = {'parent_group': parent_group_obj}
+            # Same validation Account.save() runs; uniqueness and FKs are guaranteed by the
+            # lookups above, so skip those checks (they would cost a query per row).
             try:
-                sub_group_obj, created = AccountGroup.objects.update_or_create(
-                    name=group_name_from_constant, defaults=sub_group_defaults
+                account_obj.full_clean(
+                    exclude=['account_group', 'current_balance', 'balance_last_updated'],
+                    validate_unique=False, validate_constraints=False,
                 )
-                group_objects_map[group_name_from_constant] = sub_group_obj
-                if created: created_groups_count += 1; self.stdout.write(f"  [GROUP] Created group: '{group_name_from_constant}' (Parent: {primary_name})")
-                else: skipped_groups_count += 1
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f"  [ERROR] Failed create/update group '{group_name_from_constant}': {e}. Skipping its accounts."))
+            except ValidationError as e:
+                self.stderr.write(self.style.ERROR(f"  [ERROR][Validation] Account {account_code_clean}: {e.message_dict if hasattr(e, 'message_dict') else e}"))
                 continue
 
-            # Determine Account Type for accounts in this group
-            account_type_member = GROUP_CONCEPT_TO_ACCOUNT_TYPE.get(primary_name)
-            if not account_type_member:
-                 self.stderr.write(self.style.WARNING(f"  [WARN] Undetermined AccountType for primary concept '{primary_name}'. Skipping accounts in '{group_name_from_constant}'."))
-                 continue
-
-            # --- *** Determine Default PL Section for this group's accounts *** ---
-            default_pl_section_member = ACCOUNT_TYPE_TO_DEFAULT_PL_SECTION.get(account_type_member, PLSection.NONE)
-            # --- *** END Determine PL Section *** ---
-
-            # --- Account Creation/Update Loop ---
-            for account_code, account_name in roles:
-                account_code_clean = account_code.strip()
-                account_name_clean = account_name.strip()
-
-                is_control = account_code_clean in CONTROL_ACCOUNTS_MAP
-                control_party_type_name = CONTROL_ACCOUNTS_MAP.get(account_code_clean)
-
-                # --- *** Start with the default P&L section based on type *** ---
-                final_pl_section_member = default_pl_section_member
-                # --- *** END Default *** ---
-
-                # --- *** Add Overrides for Specific Accounts if needed *** ---
-                # Example: Classify specific expense accounts
-                if account_type_member == AccountType.EXPENSE:
-                    if 'tax' in account_name_clean.lower():
-                        final_pl_section_member = PLSection.TAX_EXPENSE
-                    elif 'interest expense' in account_name_clean.lower(): # Be specific
-                        final_pl_section_member = PLSection.OTHER_EXPENSE
-                    # Add more specific overrides based on name/code if the default isn't right
-                    # elif account_code_clean == '6XXX': final_pl_section_member = PLSection.OTHER_EXPENSE
-                elif account_type_member == AccountType.INCOME:
-                    if 'interest income' in account_name_clean.lower(): # Be specific
-                        final_pl_section_member = PLSection.OTHER_INCOME
-                    # Add more specific overrides if needed
-                # --- *** END Overrides *** ---
-
-                account_defaults = {
-                    'account_name': account_name_clean,
-                    'account_group': sub_group_obj,
-                    'account_type': account_type_member.value, # Use .value for db choice
-                    'currency': CurrencyType.INR.value, # Use .value for db choice
-                    'pl_section': final_pl_section_member.value, # <<< ADDED: Use .value for db choice
-                    'description': '',
-                    'allow_direct_posting': True,
-                    'is_active': True,
-                    'is_control_account': is_control,
-                    'control_account_party_type': control_party_type_name,
-                }
-
-                try:
-                    account_obj, created = Account.objects.update_or_create(
-                        account_number=account_code_clean,
-                        defaults=account_defaults
-                    )
-                    if created:
-                        created_accounts_count += 1
-                    else:
-                        # Only count as updated if something *actually* changed.
-                        # update_or_create doesn't easily tell us this.
-                        # If you want accurate update counts, you'd need to fetch first, compare, then save.
-                        # For simplicity, we'll assume non-created means potentially updated or skipped.
-                        updated_accounts_count += 1 # Increment update/skipped count
-                        # Optionally log the PL section being set/confirmed
-                        # self.stdout.write(f"    [ACCOUNT] Processed {account_code_clean} (PL Section: {final_pl_section_member.name})")
-
-                except IntegrityError as e:
-                     self.stderr.write(self.style.ERROR(f"  [ERROR][Integrity] Account {account_code_clean}: {e}"))
-                     updated_accounts_count -= 1 # Decrement if errored
-                except ValidationError as e:
-                     self.stderr.write(self.style.ERROR(f"  [ERROR][Validation] Account {account_code_clean}: {e.message_dict if hasattr(e, 'message_dict') else e}"))
-                     updated_accounts_count -= 1 # Decrement if errored
-                except Exception as e:
-                     self.stderr.write(self.style.ERROR(f"  [ERROR][General] Account {account_code_clean}: {e}"))
-                     updated_accounts_count -= 1 # Decrement if errored
+            if changed_fields is None:
+                to_create.append(account_obj)
+            else:
+                to_update[changed_fields].append(account_obj)
 
+        try:
+            if to_create or to_update:
+                with transaction.atomic(): # Savepoint: a failed batch can be re-tried row by row below
+                    self._write_accounts(to_create, to_update, now, batch_size)
+        except IntegrityError as e:
+            failures = self._find_failing_accounts(chain(to_create, chain.from_iterable(to_update.values())))
+            for account_obj, error in failures:
+                self.stderr.write(self.style.ERROR(f"  [ERROR][Integrity] Account {account_obj.account_number}: {error}"))
+            raise CommandError(f"Account bulk write failed, no changes were saved: {e}")
+        created_accounts_count = len(to_create)
+        updated_accounts_count = sum(len(accounts) for accounts in to_update.values())
+        if progress:
+            self.stdout.write('\n'.join(progress))
 
         # --- Final Summary ---
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS('--- Chart of Accounts Seeding/Update Complete ---'))
         self.stdout.write(f'  Groups Created: {created_groups_count}')
-        # self.stdout.write(f'  Groups Updated: {updated_groups_count}') # update_or_create doesn't tell us this easily
-        self.stdout.write(f'  Groups Skipped/Found: {skipped_groups_count}')
+        self.stdout.write(f'  Groups Updated: {updated_groups_count}')
+        self.stdout.write(f'  Groups Skipped (Unchanged): {skipped_groups_count}')
         self.stdout.write(f'  Accounts Created: {created_accounts_count}')
-        # self.stdout.write(f'  Accounts Updated: {updated_accounts_count}') # This count now includes skipped/found
-        self.stdout.write(f'  Accounts Processed (Updated/Skipped/Found): {updated_accounts_count}')
+        self.stdout.write(f'  Accounts Updated: {updated_accounts_count}')
+        self.stdout.write(f'  Accounts Skipped (Unchanged): {skipped_accounts_count}')
         self.stdout.write(self.style.SUCCESS('---------------------------------------------------'))
+        if options.get('dry_run'):
+            transaction.set_rollback(True) # Undo everything written above when handle()'s atomic block exits
+            self.stdout.write(self.style.WARNING('Dry run: all changes rolled back.'))
 # # crp_accounting/management/commands/seed_coa.py
 #
 # import logging
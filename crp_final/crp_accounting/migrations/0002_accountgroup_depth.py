@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-15 22:13
+
+from django.db import migrations, models
+
+
+def backfill_depth(apps, schema_editor):
+    """Breadth-first walk from the root groups, one UPDATE per tree level."""
+    AccountGroup = apps.get_model('crp_accounting', 'AccountGroup')
+    level_pks = list(AccountGroup.objects.filter(parent_group__isnull=True).values_list('pk', flat=True))
+    visited = set(level_pks)
+    depth = 0
+    while level_pks:
+        AccountGroup.objects.filter(pk__in=level_pks).update(depth=depth)
+        level_pks = list(
+            AccountGroup.objects.filter(parent_group_id__in=level_pks)
+            .exclude(pk__in=visited)
+            .values_list('pk', flat=True)
+        )
+        visited.update(level_pks)
+        depth += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accountgroup',
+            name='depth',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, help_text='System-maintained nesting level in the group hierarchy (0 = top-level).', verbose_name='Depth'),
+        ),
+        migrations.RunPython(backfill_depth, migrations.RunPython.noop),
+    ]
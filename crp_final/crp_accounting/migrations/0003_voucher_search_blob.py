@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-15 22:15
+
+from django.db import migrations, models
+
+
+def _parts(*columns):
+    """SQL text of the non-empty columns, each prefixed with one space."""
+    return ' || '.join(f"COALESCE(' ' || NULLIF({column}, ''), '')" for column in columns)
+
+
+# Voucher.refresh_search_blob joins the non-empty header, party and line values with single
+# spaces; every part carries a leading space here and substr(..., 2) drops the first one.
+_HEADER_PARTS = _parts('h.voucher_number', 'h.reference', 'h.narration', 'p.name')
+_LINE_PARTS = _parts('l.narration', 'a.account_name', 'a.account_number')
+
+# PostgreSQL: one UPDATE joined to the line text aggregated per voucher in a single pass
+_PG_BACKFILL_SQL = f"""
+UPDATE crp_accounting_voucher AS v
+SET search_blob = substr({_HEADER_PARTS} || COALESCE(lines.text, ''), 2)
+FROM crp_accounting_voucher AS h
+LEFT JOIN crp_accounting_party AS p ON p.id = h.party_id
+LEFT JOIN (
+    SELECT l.voucher_id, string_agg({_LINE_PARTS}, '' ORDER BY l.id) AS text
+    FROM crp_accounting_voucherline AS l
+    JOIN crp_accounting_account AS a ON a.id = l.account_id
+    GROUP BY l.voucher_id
+) AS lines ON lines.voucher_id = h.id
+WHERE h.id = v.id
+"""
+
+# Other backends (SQLite before 3.33 has no UPDATE ... FROM): one UPDATE with correlated subqueries
+_DEFAULT_BACKFILL_SQL = f"""
+UPDATE crp_accounting_voucher
+SET search_blob = substr(
+    (SELECT {_HEADER_PARTS}
+     FROM crp_accounting_voucher AS h
+     LEFT JOIN crp_accounting_party AS p ON p.id = h.party_id
+     WHERE h.id = crp_accounting_voucher.id)
+    || COALESCE((
+        SELECT group_concat(text, '') FROM (
+            SELECT {_LINE_PARTS} AS text
+            FROM crp_accounting_voucherline AS l
+            JOIN crp_accounting_account AS a ON a.id = l.account_id
+            WHERE l.voucher_id = crp_accounting_voucher.id
+            ORDER BY l.id
+        )
+    ), ''),
+    2
+)
+"""
+
+
+def backfill_search_blob(apps, schema_editor):
+    """Populates search_blob for existing vouchers in one set-based UPDATE (mirrors Voucher.refresh_search_blob)."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(_PG_BACKFILL_SQL)
+    else:
+        schema_editor.execute(_DEFAULT_BACKFILL_SQL)
+
+
+def create_trigram_index(apps, schema_editor):
+    """GIN trigram index so admin icontains searches on search_blob can use an index (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS voucher_search_blob_trgm "
+        "ON crp_accounting_voucher USING GIN (search_blob gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS voucher_search_blob_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0002_accountgroup_depth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voucher',
+            name='search_blob',
+            field=models.TextField(blank=True, default='', editable=False, help_text='System-maintained concatenation of voucher, party and line text used for searching.'),
+        ),
+        migrations.RunPython(backfill_search_blob, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
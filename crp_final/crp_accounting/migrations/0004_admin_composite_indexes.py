@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-15 22:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('crp_accounting', '0003_voucher_search_blob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['account_group', 'account_number'], name='crp_account_account_8f7914_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['is_active', 'account_type'], name='crp_account_is_acti_62e6f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['-date', '-voucher_number'], name='crp_account_date_ca02ea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['status', '-date'], name='crp_account_status_b02415_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['accounting_period', '-date'], name='crp_account_account_113e99_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucher',
+            index=models.Index(fields=['party', '-date'], name='crp_account_party_i_63faf0_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-15 22:41
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    """GIN trigram index for icontains lookups on AccountGroup.name (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS accountgroup_name_trgm "
+        "ON crp_accounting_accountgroup USING GIN (name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS accountgroup_name_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0004_admin_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
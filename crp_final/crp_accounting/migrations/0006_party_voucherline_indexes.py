@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-15 22:27
+
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    """GIN trigram index for the PartyAdmin icontains search on name/email/phone (PostgreSQL only)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS party_search_trgm ON crp_accounting_party "
+        "USING GIN (name gin_trgm_ops, contact_email gin_trgm_ops, contact_phone gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS party_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0005_accountgroup_name_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='party',
+            index=models.Index(fields=['party_type', 'is_active', 'control_account'], name='crp_account_party_t_1f4313_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='party',
+            index=models.Index(fields=['control_account', 'is_active'], name='crp_account_control_ff6ee0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voucherline',
+            index=models.Index(fields=['account', 'voucher'], include=('dr_cr', 'amount'), name='voucherline_acct_voucher_cov'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
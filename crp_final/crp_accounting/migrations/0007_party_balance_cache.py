@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-15 22:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Lifetime party balance: the party's voucher lines on its control account,
+# signed by the control account's nature (mirrors Party.calculate_outstanding_balance).
+PARTY_BALANCE_SELECT = """
+    SELECT p.id AS party_id,
+           SUM(CASE WHEN vl.dr_cr = 'DEBIT' THEN vl.amount ELSE -vl.amount END)
+               * (CASE WHEN a.account_nature = 'CREDIT' THEN -1 ELSE 1 END) AS balance
+    FROM crp_accounting_party p
+    JOIN crp_accounting_account a ON a.id = p.control_account_id
+    JOIN crp_accounting_voucher v ON v.party_id = p.id
+    JOIN crp_accounting_voucherline vl ON vl.voucher_id = v.id AND vl.account_id = p.control_account_id
+    GROUP BY p.id, a.account_nature
+"""
+
+
+def create_party_balance_cache(apps, schema_editor):
+    """Materialized view (refreshed periodically) on PostgreSQL; a plain, always-current view elsewhere."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"CREATE MATERIALIZED VIEW party_balance_cache AS {PARTY_BALANCE_SELECT} WITH DATA")
+        # Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+        schema_editor.execute("CREATE UNIQUE INDEX party_balance_cache_party_id ON party_balance_cache (party_id)")
+    else:
+        schema_editor.execute(f"CREATE VIEW party_balance_cache AS {PARTY_BALANCE_SELECT}")
+
+
+def drop_party_balance_cache(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP MATERIALIZED VIEW IF EXISTS party_balance_cache")
+    else:
+        schema_editor.execute("DROP VIEW IF EXISTS party_balance_cache")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0006_party_voucherline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartyBalanceCache',
+            fields=[
+                ('party', models.OneToOneField(db_column='party_id', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='balance_cache', serialize=False, to='crp_accounting.party')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=20)),
+            ],
+            options={
+                'verbose_name': 'Party Balance (Cached)',
+                'verbose_name_plural': 'Party Balances (Cached)',
+                'db_table': 'party_balance_cache',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_party_balance_cache, drop_party_balance_cache),
+    ]
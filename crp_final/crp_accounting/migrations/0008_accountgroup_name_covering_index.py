@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-15 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0007_party_balance_cache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accountgroup',
+            name='name',
+            field=models.CharField(help_text='Unique name for the account group (e.g., Current Assets, Operating Expenses).', max_length=150, unique=True, verbose_name='Group Name'),
+        ),
+        migrations.AddIndex(
+            model_name='accountgroup',
+            index=models.Index(fields=['name'], include=('parent_group',), name='ag_name_cover'),
+        ),
+    ]
@@ -0,0 +1,183 @@
+# Generated by Django 5.2 on 2026-10-15 22:45
+
+from django.db import migrations, models
+
+# Running posted totals per account and voucher date (mirrors Account.get_dynamic_balance)
+SNAPSHOT_SELECT = """
+    SELECT vl.account_id AS account_id,
+           v.date AS as_of_date,
+           SUM(SUM(CASE WHEN vl.dr_cr = 'DEBIT' THEN vl.amount ELSE 0 END))
+               OVER (PARTITION BY vl.account_id ORDER BY v.date) AS running_debit,
+           SUM(SUM(CASE WHEN vl.dr_cr = 'CREDIT' THEN vl.amount ELSE 0 END))
+               OVER (PARTITION BY vl.account_id ORDER BY v.date) AS running_credit
+    FROM crp_accounting_voucherline vl
+    JOIN crp_accounting_voucher v ON v.id = vl.voucher_id
+    WHERE v.status = 'POSTED'
+    GROUP BY vl.account_id, v.date
+"""
+
+# PostgreSQL: a table maintained incrementally by row triggers.
+# account_balance_snapshot_apply() adds a debit/credit delta dated p_date to the
+# account's row for that date (created from the previous running totals if
+# missing) and to every later row; writers are serialized per account.
+POSTGRES_CREATE = [
+    """
+    CREATE TABLE account_balance_snapshot (
+        account_id bigint NOT NULL REFERENCES crp_accounting_account (id) ON DELETE CASCADE,
+        as_of_date date NOT NULL,
+        running_debit numeric NOT NULL DEFAULT 0,
+        running_credit numeric NOT NULL DEFAULT 0,
+        PRIMARY KEY (account_id, as_of_date)
+    )
+    """,
+    f"INSERT INTO account_balance_snapshot (account_id, as_of_date, running_debit, running_credit) {SNAPSHOT_SELECT}",
+    """
+    CREATE FUNCTION account_balance_snapshot_apply(p_account_id bigint, p_date date, p_debit numeric, p_credit numeric)
+    RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        IF p_debit = 0 AND p_credit = 0 THEN
+            RETURN;
+        END IF;
+        PERFORM pg_advisory_xact_lock(hashtextextended('account_balance_snapshot', p_account_id));
+        INSERT INTO account_balance_snapshot (account_id, as_of_date, running_debit, running_credit)
+        SELECT p_account_id, p_date, COALESCE(prev.running_debit, 0), COALESCE(prev.running_credit, 0)
+        FROM (SELECT 1) AS one
+        LEFT JOIN LATERAL (
+            SELECT s.running_debit, s.running_credit
+            FROM account_balance_snapshot s
+            WHERE s.account_id = p_account_id AND s.as_of_date < p_date
+            ORDER BY s.as_of_date DESC
+            LIMIT 1
+        ) AS prev ON TRUE
+        ON CONFLICT (account_id, as_of_date) DO NOTHING;
+        UPDATE account_balance_snapshot
+        SET running_debit = running_debit + p_debit, running_credit = running_credit + p_credit
+        WHERE account_id = p_account_id AND as_of_date >= p_date;
+    END $$
+    """,
+    """
+    CREATE FUNCTION account_balance_snapshot_voucherline() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        v_date date;
+    BEGIN
+        IF TG_OP = 'UPDATE' AND (OLD.voucher_id, OLD.account_id, OLD.dr_cr, OLD.amount)
+                IS NOT DISTINCT FROM (NEW.voucher_id, NEW.account_id, NEW.dr_cr, NEW.amount) THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            SELECT date INTO v_date FROM crp_accounting_voucher WHERE id = OLD.voucher_id AND status = 'POSTED';
+            IF FOUND THEN
+                PERFORM account_balance_snapshot_apply(
+                    OLD.account_id, v_date,
+                    CASE WHEN OLD.dr_cr = 'DEBIT' THEN -OLD.amount ELSE 0 END,
+                    CASE WHEN OLD.dr_cr = 'CREDIT' THEN -OLD.amount ELSE 0 END
+                );
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            SELECT date INTO v_date FROM crp_accounting_voucher WHERE id = NEW.voucher_id AND status = 'POSTED';
+            IF FOUND THEN
+                PERFORM account_balance_snapshot_apply(
+                    NEW.account_id, v_date,
+                    CASE WHEN NEW.dr_cr = 'DEBIT' THEN NEW.amount ELSE 0 END,
+                    CASE WHEN NEW.dr_cr = 'CREDIT' THEN NEW.amount ELSE 0 END
+                );
+            END IF;
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE TRIGGER account_balance_snapshot_voucherline
+    AFTER INSERT OR UPDATE OR DELETE ON crp_accounting_voucherline
+    FOR EACH ROW EXECUTE FUNCTION account_balance_snapshot_voucherline()
+    """,
+    """
+    CREATE FUNCTION account_balance_snapshot_voucher() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        line record;
+    BEGIN
+        IF OLD.status = 'POSTED' THEN
+            FOR line IN
+                SELECT account_id,
+                       SUM(CASE WHEN dr_cr = 'DEBIT' THEN amount ELSE 0 END) AS debit,
+                       SUM(CASE WHEN dr_cr = 'CREDIT' THEN amount ELSE 0 END) AS credit
+                FROM crp_accounting_voucherline WHERE voucher_id = OLD.id
+                GROUP BY account_id ORDER BY account_id
+            LOOP
+                PERFORM account_balance_snapshot_apply(line.account_id, OLD.date, -line.debit, -line.credit);
+            END LOOP;
+        END IF;
+        IF NEW.status = 'POSTED' THEN
+            FOR line IN
+                SELECT account_id,
+                       SUM(CASE WHEN dr_cr = 'DEBIT' THEN amount ELSE 0 END) AS debit,
+                       SUM(CASE WHEN dr_cr = 'CREDIT' THEN amount ELSE 0 END) AS credit
+                FROM crp_accounting_voucherline WHERE voucher_id = NEW.id
+                GROUP BY account_id ORDER BY account_id
+            LOOP
+                PERFORM account_balance_snapshot_apply(line.account_id, NEW.date, line.debit, line.credit);
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE TRIGGER account_balance_snapshot_voucher
+    AFTER UPDATE OF status, date ON crp_accounting_voucher
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.date IS DISTINCT FROM NEW.date)
+    EXECUTE FUNCTION account_balance_snapshot_voucher()
+    """,
+]
+
+POSTGRES_DROP = [
+    "DROP TRIGGER IF EXISTS account_balance_snapshot_voucher ON crp_accounting_voucher",
+    "DROP TRIGGER IF EXISTS account_balance_snapshot_voucherline ON crp_accounting_voucherline",
+    "DROP FUNCTION IF EXISTS account_balance_snapshot_voucher()",
+    "DROP FUNCTION IF EXISTS account_balance_snapshot_voucherline()",
+    "DROP FUNCTION IF EXISTS account_balance_snapshot_apply(bigint, date, numeric, numeric)",
+    "DROP TABLE IF EXISTS account_balance_snapshot",
+]
+
+
+def create_account_balance_snapshot(apps, schema_editor):
+    """Trigger-maintained table on PostgreSQL; a plain, always-current view elsewhere."""
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+    else:
+        schema_editor.execute(f"CREATE VIEW account_balance_snapshot AS {SNAPSHOT_SELECT}")
+
+
+def drop_account_balance_snapshot(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_DROP:
+            schema_editor.execute(statement)
+    else:
+        schema_editor.execute("DROP VIEW IF EXISTS account_balance_snapshot")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0008_accountgroup_name_covering_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalanceSnapshot',
+            fields=[
+                ('pk', models.CompositePrimaryKey('account', 'as_of_date', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('as_of_date', models.DateField()),
+                ('running_debit', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('running_credit', models.DecimalField(decimal_places=2, max_digits=20)),
+            ],
+            options={
+                'verbose_name': 'Account Balance Snapshot',
+                'verbose_name_plural': 'Account Balance Snapshots',
+                'db_table': 'account_balance_snapshot',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_account_balance_snapshot, drop_account_balance_snapshot),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-15 22:50
+
+from importlib import import_module
+
+import django.db.models.lookups
+from django.db import migrations, models
+
+# party_balance_cache reads crp_accounting_account.account_nature, so it is dropped
+# while the column is replaced and recreated from the same definition afterwards.
+party_balance_cache = import_module('crp_accounting.migrations.0007_party_balance_cache')
+
+DEBIT_NATURE_ACCOUNT_TYPES = ['ASSET', 'COGS', 'EXPENSE']
+
+
+def restore_account_nature(apps, schema_editor):
+    """Reverse only: refill the plain account_nature column from account_type."""
+    Account = apps.get_model('crp_accounting', 'Account')
+    Account.objects.update(account_nature=models.Case(
+        models.When(account_type__in=DEBIT_NATURE_ACCOUNT_TYPES, then=models.Value('DEBIT')),
+        default=models.Value('CREDIT'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0009_account_balance_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(party_balance_cache.drop_party_balance_cache, party_balance_cache.create_party_balance_cache),
+        # Nullable first, so that on reverse the plain column can be re-added and refilled before NOT NULL returns
+        migrations.AlterField(
+            model_name='account',
+            name='account_nature',
+            field=models.CharField(choices=[('DEBIT', 'Debit'), ('CREDIT', 'Credit')], editable=False, help_text='System-inferred nature (Debit/Credit). Based on Account Type.', max_length=10, null=True, verbose_name='Account Nature'),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, restore_account_nature),
+        # A regular column cannot be altered into a generated one: drop and re-add it
+        migrations.RemoveField(
+            model_name='account',
+            name='account_nature',
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='account_nature',
+            field=models.GeneratedField(choices=[('DEBIT', 'Debit'), ('CREDIT', 'Credit')], db_persist=True, expression=models.Case(models.When(django.db.models.lookups.In(models.F('account_type'), ['ASSET', 'COGS', 'EXPENSE']), then=models.Value('DEBIT')), default=models.Value('CREDIT')), help_text='System-inferred nature (Debit/Credit). Based on Account Type.', output_field=models.CharField(choices=[('DEBIT', 'Debit'), ('CREDIT', 'Credit')], max_length=10), verbose_name='Account Nature'),
+        ),
+        migrations.RunPython(party_balance_cache.create_party_balance_cache, party_balance_cache.drop_party_balance_cache),
+    ]
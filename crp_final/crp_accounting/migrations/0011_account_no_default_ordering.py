@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-15 22:54
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0010_account_nature_generated'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='account',
+            options={'permissions': [('view_financial_reports', 'Can view financial reports')], 'verbose_name': 'Account', 'verbose_name_plural': 'Accounts'},
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-15 22:55
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# SQLite rebuilds crp_accounting_account for this AlterField, which the party_balance_cache
+# view references; drop it around the change as in 0010.
+party_balance_cache = import_module('crp_accounting.migrations.0007_party_balance_cache')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0011_account_no_default_ordering'),
+    ]
+
+    operations = [
+        migrations.RunPython(party_balance_cache.drop_party_balance_cache, party_balance_cache.create_party_balance_cache),
+        migrations.AlterField(
+            model_name='account',
+            name='account_name',
+            field=models.CharField(help_text='Human-readable name (e.g., Cash On Hand, Sales Revenue - Services).', max_length=255, verbose_name='Account Name'),
+        ),
+        migrations.RunPython(party_balance_cache.create_party_balance_cache, party_balance_cache.drop_party_balance_cache),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-15 22:57
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# SQLite rebuilds crp_accounting_account to change its constraints, which the
+# party_balance_cache view references; drop it around the change as in 0010.
+party_balance_cache = import_module('crp_accounting.migrations.0007_party_balance_cache')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crp_accounting', '0012_account_name_drop_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(party_balance_cache.drop_party_balance_cache, party_balance_cache.create_party_balance_cache),
+        migrations.RemoveConstraint(
+            model_name='account',
+            name='control_account_requires_party_type',
+        ),
+        migrations.RemoveConstraint(
+            model_name='account',
+            name='party_type_requires_control_account',
+        ),
+        migrations.AddConstraint(
+            model_name='account',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('control_account_party_type__isnull', False), ('is_control_account', True)), models.Q(('control_account_party_type__isnull', True), ('is_control_account', False)), _connector='OR'), name='control_account_party_type_consistent', violation_error_message='Control accounts must specify a Control Account Party Type, and only Control Accounts may have one.'),
+        ),
+        migrations.RunPython(party_balance_cache.create_party_balance_cache, party_balance_cache.drop_party_balance_cache),
+    ]
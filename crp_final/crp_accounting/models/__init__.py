@@ -1,4 +1,4 @@
-from .coa import AccountGroup, Account
-from .party import Party
+from .coa import AccountGroup, Account, AccountBalanceSnapshot
+from .party import Party, PartyBalanceCache
 from .journal import *
 from .period import FiscalYear
\ No newline at end of file
@@ -4,29 +4,61 @@
 
 import logging
 from decimal import Decimal
-from django.db import models, transaction
+from types import MappingProxyType
+from django.db import connection, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.lookups import In
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
+from django.core.cache import cache as shared_cache # django.core.cache default; request_cache() is per request
 from django.core.exceptions import ValidationError
 from django.utils import timezone # Needed for balance_last_updated
 
 # Assuming enums are defined correctly in crp_core/enums.py
 # Ensure these enums exist and are properly defined.
 from crp_core.enums import AccountType, AccountNature, CurrencyType, PartyType, DrCrType
+from crp_core.middleware import request_cache
 
 logger = logging.getLogger(__name__)
 
 # --- Constants ---
 # --- CORRECTED Dictionary: Using Enum VALUES as Keys ---
-# This dictionary is used by Account.save() to determine the nature.
+# This dictionary defines the nature derived by the database for Account.account_nature.
 # The keys MUST match the values stored in the Account.account_type field.
-ACCOUNT_TYPE_TO_NATURE = {
+# Read-only view: shared by every request/worker and never modified at runtime.
+ACCOUNT_TYPE_TO_NATURE = MappingProxyType({
     AccountType.ASSET.value: AccountNature.DEBIT.name,           # e.g., 'ASSET': 'DEBIT'
     AccountType.LIABILITY.value: AccountNature.CREDIT.name,      # e.g., 'LIABILITY': 'CREDIT'
     AccountType.EQUITY.value: AccountNature.CREDIT.name,         # e.g., 'EQUITY': 'CREDIT'
     AccountType.INCOME.value: AccountNature.CREDIT.name,         # e.g., 'INCOME': 'CREDIT'
     AccountType.EXPENSE.value: AccountNature.DEBIT.name,         # e.g., 'EXPENSE': 'DEBIT'
     AccountType.COST_OF_GOODS_SOLD.value: AccountNature.DEBIT.name, # e.g., 'COGS': 'DEBIT' <-- Corrected Key
-}
+})
+# Account types with a debit nature; every other type is credit-natured
+DEBIT_NATURE_ACCOUNT_TYPES = sorted(
+    account_type for account_type, nature in ACCOUNT_TYPE_TO_NATURE.items() if nature == AccountNature.DEBIT.name
+)
+# Account types that belong on the P&L and therefore need a pl_section (checked in Account.clean)
+_PL_TYPES = frozenset({
+    AccountType.INCOME.value,
+    AccountType.EXPENSE.value,
+    AccountType.COST_OF_GOODS_SOLD.value,
+})
+# Stored account_nature values, bound once for the balance paths
+_DEBIT = AccountNature.DEBIT.value
+_CREDIT = AccountNature.CREDIT.value
+# Shared, never-mutated values for the balance queries (expressions are copied when resolved)
+_ZERO = Decimal('0.00')
+_CENTS = Decimal('0.01')
+_BALANCE_FIELD = models.DecimalField(max_digits=20, decimal_places=2)
+_DEBIT_SIGNED_BALANCE = models.F('running_debit') - models.F('running_credit')
+_CREDIT_SIGNED_BALANCE = models.F('running_credit') - models.F('running_debit')
+# request_cache() key of the {(account_pk, date_upto, start_date): balance} memo
+_BALANCE_CACHE_KEY = 'account_dynamic_balances'
+# Party types that have control accounts, and how long control_account_pks() results stay cached
+_CONTROL_PARTY_TYPES = (PartyType.CUSTOMER.value, PartyType.SUPPLIER.value)
+CONTROL_ACCOUNT_PKS_TIMEOUT = 60
 
 
 # =============================================================================
@@ -46,6 +78,8 @@ class PLSection(models.TextChoices):
     DEPRECIATION_AMORTIZATION = 'DEPR_AMORT', _('Depreciation & Amortization')
     NONE = 'NONE', _('Not Applicable (Balance Sheet)') # Default for non-P&L accounts
 
+_NONE_PL = PLSection.NONE.value
+
 # =============================================================================
 # Account Group Model
 # =============================================================================
@@ -57,8 +91,7 @@ class AccountGroup(models.Model):
     name = models.CharField(
         _("Group Name"),
         max_length=150,
-        unique=True,
-        db_index=True,
+        unique=True, # The unique index also serves name lookups; see Meta.indexes for the covering one
         help_text=_("Unique name for the account group (e.g., Current Assets, Operating Expenses).")
     )
     description = models.TextField(
@@ -75,6 +108,14 @@ class AccountGroup(models.Model):
         related_name='sub_groups',
         help_text=_("Assign parent for hierarchy. Leave blank for top-level.")
     )
+    # Denormalized nesting level (0 for top-level groups), maintained in save()
+    depth = models.PositiveSmallIntegerField(
+        _("Depth"),
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text=_("System-maintained nesting level in the group hierarchy (0 = top-level).")
+    )
 
     created_at = models.DateTimeField(_("Created At"), auto_now_add=True, editable=False)
     updated_at = models.DateTimeField(_("Updated At"), auto_now=True, editable=False)
@@ -83,16 +124,67 @@ class AccountGroup(models.Model):
         verbose_name = _('Account Group')
         verbose_name_plural = _('Account Groups')
         ordering = ['name']
+        indexes = [
+            # Group-by-name lookups that also need the parent resolve from the index alone (PostgreSQL INCLUDE)
+            models.Index(fields=['name'], include=['parent_group'], name='ag_name_cover'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Overrides save to keep the denormalized depth in sync with parent_group."""
+        if self.parent_group_id:
+            parent_depth = AccountGroup.objects.values_list('depth', flat=True).get(pk=self.parent_group_id)
+            self.depth = parent_depth + 1
+        else:
+            self.depth = 0
+
+        previous_depth = None
+        if not self._state.adding and self.pk:
+            previous_depth = AccountGroup.objects.filter(pk=self.pk).values_list('depth', flat=True).first()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent_group' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'depth'}
+
+        super().save(*args, **kwargs)
+
+        # Re-parenting shifts the whole subtree; update descendants level by level.
+        if previous_depth is not None and previous_depth != self.depth:
+            self._sync_descendant_depths()
+
+    def _sync_descendant_depths(self):
+        """Propagates this group's depth to all descendants (one UPDATE per tree level)."""
+        level_pks = [self.pk]
+        visited = {self.pk}
+        level_depth = self.depth
+        while level_pks:
+            level_depth += 1
+            child_pks = list(
+                AccountGroup.objects.filter(parent_group_id__in=level_pks)
+                .exclude(pk__in=visited) # Guard against accidental cycles
+                .values_list('pk', flat=True)
+            )
+            visited.update(child_pks)
+            if child_pks:
+                AccountGroup.objects.filter(pk__in=child_pks).update(depth=level_depth)
+            level_pks = child_pks
+
     def get_all_child_accounts(self):
-        """Recursively gets all accounts under this group and its sub-groups."""
-        accounts = list(self.accounts.all())
-        for sub_group in self.sub_groups.all():
-            accounts.extend(sub_group.get_all_child_accounts())
-        return accounts
+        """
+        Returns a queryset of all accounts under this group and its sub-groups (any depth).
+        The subtree is resolved in SQL with one recursive CTE instead of a query per node.
+        """
+        table = connection.ops.quote_name(AccountGroup._meta.db_table)
+        descendant_ids = RawSQL(
+            f"WITH RECURSIVE descendants(id) AS ("
+            f"SELECT id FROM {table} WHERE id = %s "
+            f"UNION SELECT g.id FROM {table} g JOIN descendants d ON g.parent_group_id = d.id" # UNION: stops on cycles
+            f") SELECT id FROM descendants",
+            (self.pk,),
+        )
+        return Account.objects.filter(account_group_id__in=descendant_ids).order_by('account_group__name', 'account_number')
 
 # =============================================================================
 # Account Model
@@ -113,8 +205,7 @@ class Account(models.Model):
     )
     account_name = models.CharField(
         _("Account Name"),
-        max_length=255,
-        db_index=True,
+        max_length=255, # Unindexed: name searches are icontains, which a B-tree cannot serve
         help_text=_("Human-readable name (e.g., Cash On Hand, Sales Revenue - Services).")
     )
     description = models.TextField(
@@ -138,11 +229,17 @@ class Account(models.Model):
         db_index=True,
         help_text=_("Fundamental accounting classification (Asset, Liability, etc.).")
     )
-    account_nature = models.CharField(
-        _("Account Nature"),
-        max_length=10, # Should match 'DEBIT' or 'CREDIT'
+    # Derived by the database from account_type (stored generated column), never written by Python
+    account_nature = models.GeneratedField(
+        expression=models.Case(
+            # A lookup expression, not account_type__in=...: constraint validation cannot rewrite a Q here
+            models.When(In(models.F('account_type'), DEBIT_NATURE_ACCOUNT_TYPES), then=models.Value(AccountNature.DEBIT.value)),
+            default=models.Value(AccountNature.CREDIT.value),
+        ),
+        output_field=models.CharField(max_length=10, choices=AccountNature.choices), # Should match 'DEBIT' or 'CREDIT'
+        db_persist=True,
+        verbose_name=_("Account Nature"),
         choices=AccountNature.choices,
-        editable=False,
         help_text=_("System-inferred nature (Debit/Credit). Based on Account Type.")
     )
     pl_section = models.CharField(
@@ -208,23 +305,25 @@ class Account(models.Model):
     class Meta:
         verbose_name = _('Account')
         verbose_name_plural = _('Accounts')
-        ordering = ['account_group__name', 'account_number']
+        # No default ordering: it joined AccountGroup and sorted every Account query.
+        # Listings order explicitly (group name then number, or just account_number).
         indexes = [
             models.Index(fields=['account_type']),
             models.Index(fields=['pl_section']),
             models.Index(fields=['is_active', 'allow_direct_posting']),
             models.Index(fields=['is_control_account', 'control_account_party_type']),
+            models.Index(fields=['account_group', 'account_number']),
+            models.Index(fields=['is_active', 'account_type']),
         ]
         constraints = [
+            # is_control_account <=> control_account_party_type is set, as one row check
             models.CheckConstraint(
-                check=models.Q(is_control_account=False) | models.Q(control_account_party_type__isnull=False),
-                name='control_account_requires_party_type',
-                violation_error_message=_("Control accounts must specify a Control Account Party Type.")
-            ),
-            models.CheckConstraint(
-                check=models.Q(is_control_account=True) | models.Q(control_account_party_type__isnull=True),
-                name='party_type_requires_control_account',
-                violation_error_message=_("Control Account Party Type can only be set on Control Accounts.")
+                check=(
+                    models.Q(is_control_account=True, control_account_party_type__isnull=False)
+                    | models.Q(is_control_account=False, control_account_party_type__isnull=True)
+                ),
+                name='control_account_party_type_consistent',
+                violation_error_message=_("Control accounts must specify a Control Account Party Type, and only Control Accounts may have one.")
             ),
         ]
         permissions = [
@@ -234,6 +333,28 @@ class Account(models.Model):
     def __str__(self):
         return f"{self.account_name} ({self.account_number})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the loaded field values so save() can validate only what changed."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _changed_validated_fields(self):
+        """
+        Names of validated fields whose value differs from the loaded row
+        (None for unsaved instances, which are validated in full).
+        Deferred fields that were never assigned are not loaded, so not compared.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if self._state.adding or loaded is None:
+            return None
+        current = self.__dict__
+        return {
+            name for attname, name in ACCOUNT_VALIDATED_FIELDS.items()
+            if attname in current and (attname not in loaded or current[attname] != loaded[attname])
+        }
+
     def clean(self):
         """Custom model validation logic run before saving."""
         super().clean()
@@ -245,106 +366,252 @@ class Account(models.Model):
 
         # --- Validate pl_section against account_type using VALUES ---
         # Check the value stored in self.account_type
-        is_pl_type = self.account_type in [
-            AccountType.INCOME.value,
-            AccountType.EXPENSE.value,
-            AccountType.COST_OF_GOODS_SOLD.value
-        ]
+        is_pl_type = self.account_type in _PL_TYPES
         # Check the value stored in self.pl_section
-        if is_pl_type and self.pl_section == PLSection.NONE.value:
+        if is_pl_type and self.pl_section == _NONE_PL:
             raise ValidationError({
                 'pl_section': _("P&L Section must be set (cannot be 'NONE') for Income, Expense, or COGS account types.")
             })
-        if not is_pl_type and self.pl_section != PLSection.NONE.value:
+        if not is_pl_type and self.pl_section != _NONE_PL:
             raise ValidationError({
                 'pl_section': _("P&L Section must be 'NONE' for Asset, Liability, or Equity account types.")
             })
         # --- End pl_section validation ---
 
-        # --- Validate account_nature logic consistency ---
-        # This ensures clean() catches mapping errors even before save() is called
-        inferred_nature = ACCOUNT_TYPE_TO_NATURE.get(self.account_type)
-        if not inferred_nature:
-            # Raise error here during clean if the mapping is missing
-             raise ValidationError({
-                 'account_type': _("System configuration error: Cannot determine nature for account type '%(type)s'. Check ACCOUNT_TYPE_TO_NATURE mapping.") % {'type': self.account_type}
-             })
-        # Temporarily set nature for other potential clean checks (optional)
-        # self.account_nature = inferred_nature
-
 
     def save(self, *args, **kwargs):
-        """Overrides save to auto-set account nature and run full validation."""
-        # 1. Auto-set nature from account type reliably before saving
-        #    Uses the ACCOUNT_TYPE_TO_NATURE dictionary defined at the top of this file.
-        #    Looks up based on the VALUE of self.account_type (e.g., 'ASSET', 'COGS').
-        inferred_nature = ACCOUNT_TYPE_TO_NATURE.get(self.account_type)
-        if inferred_nature:
-            self.account_nature = inferred_nature
-        else:
-            # This should ideally be caught by clean(), but acts as a final safeguard.
-            logger.critical(f"Account nature mapping missing for type {self.account_type} on account {self.account_number}!")
-            raise ValidationError(_(f"System Error: Cannot save Account, missing nature mapping for type '{self.account_type}'."))
-
-        # 2. Run full validation including clean() method and constraints
-        #    Use exclude for fields calculated/set elsewhere (like by async tasks)
-        self.full_clean(exclude=['current_balance', 'balance_last_updated'])
-
-        # 3. Call original save
+        """Overrides save to run full validation; account_nature is derived by the database."""
+        # 1. Run full validation including clean() method and constraints
+        #    Use exclude for fields calculated/set elsewhere (like by async tasks).
+        #    Loaded accounts only re-validate the fields that changed; nothing changed, nothing to check.
+        if 'current_balance' in (kwargs.get('update_fields') or ()):
+            raise ValueError("Account.current_balance is written by Account.apply_balance_snapshot(), not save().")
+        changed = self._changed_validated_fields()
+        if changed is None:
+            self.full_clean(exclude=['current_balance', 'balance_last_updated'])
+        elif changed:
+            unchanged = [name for name in ACCOUNT_VALIDATED_FIELDS.values() if name not in changed]
+            self.full_clean(exclude=unchanged + ['current_balance', 'balance_last_updated'])
+
+        # 2. Call original save
         super().save(*args, **kwargs)
+        if changed and 'account_type' in changed:
+            # The database recomputed account_nature (INSERTs return it); reload it lazily on next access
+            self.__dict__.pop('account_nature', None)
+        saved_fields = kwargs.get('update_fields')
+        renamed = changed and changed & {'account_name', 'account_number'}
+        if renamed and (saved_fields is None or not renamed.isdisjoint(saved_fields)):
+            # Voucher.search_blob carries line account names/numbers; deferred import (journal imports coa)
+            from crp_accounting.models.journal import Voucher
+            Voucher.refresh_search_blobs(Voucher.objects.filter(lines__account=self).values('pk'))
+        # What was just written becomes the baseline for the next save()
+        loaded = self._loaded_values if saved_fields is not None and changed is not None else {}
+        loaded.update(
+            (attname, self.__dict__[attname]) for attname, name in ACCOUNT_VALIDATED_FIELDS.items()
+            if attname in self.__dict__ and (saved_fields is None or name in saved_fields or attname in saved_fields)
+        )
+        self._loaded_values = loaded
 
     # --- Helper Properties & Methods ---
     @property
     def is_debit_nature(self) -> bool:
         """Helper property to check if the account naturally increases with debits."""
-        return self.account_nature == AccountNature.DEBIT.value # Compare against value
+        return self.account_nature == _DEBIT # Compare against value
 
     @property
     def is_credit_nature(self) -> bool:
         """Helper property to check if the account naturally increases with credits."""
-        return self.account_nature == AccountNature.CREDIT.value # Compare against value
+        return self.account_nature == _CREDIT # Compare against value
+
+    def _snapshot_balance(self, signed_balance, as_of=None, inclusive=True):
+        """
+        Signed running balance up to as_of (before it when not inclusive; all dates
+        when as_of is None), computed in SQL from the latest AccountBalanceSnapshot row.
+        """
+        snapshots = AccountBalanceSnapshot.objects.filter(account_id=self.pk)
+        if as_of:
+            snapshots = snapshots.filter(**{'as_of_date__lte' if inclusive else 'as_of_date__lt': as_of})
+        balance = snapshots.order_by('-as_of_date').values_list(signed_balance, flat=True).first()
+        # Quantized in Python: SQLite's view sums come back as float-derived Decimals (e.g. 30.6000000000000)
+        return _ZERO if balance is None else balance.quantize(_CENTS)
 
     def get_dynamic_balance(self, date_upto=None, start_date=None):
-        """Dynamically calculates the balance or movement based on posted transactions."""
-        # Import locally to avoid circular dependency
-        from crp_accounting.models.journal import VoucherLine, TransactionStatus, DrCrType
-
-        lines = VoucherLine.objects.filter(
-            account=self,
-            voucher__status=TransactionStatus.POSTED
-        )
-        date_filter = models.Q()
-        if start_date: date_filter &= models.Q(voucher__date__gte=start_date)
-        if date_upto: date_filter &= models.Q(voucher__date__lte=date_upto)
-        lines = lines.filter(date_filter)
-
-        aggregation = lines.aggregate(
-            total_debit=models.functions.Coalesce(
-                models.Sum('amount', filter=models.Q(dr_cr=DrCrType.DEBIT.value)), # Use .value
-                Decimal('0.00'), output_field=models.DecimalField()
-            ),
-            total_credit=models.functions.Coalesce(
-                models.Sum('amount', filter=models.Q(dr_cr=DrCrType.CREDIT.value)), # Use .value
-                Decimal('0.00'), output_field=models.DecimalField()
-            )
-        )
-        debit_total = aggregation['total_debit']
-        credit_total = aggregation['total_credit']
-
-        # Use helper properties which now compare values
-        if self.is_debit_nature:
-            balance = debit_total - credit_total
-        elif self.is_credit_nature:
-            balance = credit_total - debit_total
+        """
+        Dynamically calculates the balance or movement based on posted transactions.
+        Reads the running totals in AccountBalanceSnapshot (one indexed row per date bound)
+        instead of aggregating every posted voucher line of the account; the database
+        returns the balance already signed by the account's nature.
+        Within a request, results are memoized per (account, date_upto, start_date).
+        The memo is dropped by the post_save/post_delete signals of Voucher, VoucherLine
+        and Account; QuerySet.update() and bulk_create() send none, so code writing
+        postings that way must call clear_balance_memo() itself.
+        """
+        cache = request_cache()
+        if cache is None or self.pk is None:
+            return self._compute_dynamic_balance(date_upto, start_date)
+        balances = cache.setdefault(_BALANCE_CACHE_KEY, {})
+        key = (self.pk, date_upto, start_date)
+        if key not in balances:
+            balances[key] = self._compute_dynamic_balance(date_upto, start_date)
+        return balances[key]
+
+    def _compute_dynamic_balance(self, date_upto, start_date):
+        """get_dynamic_balance() without the request memo."""
+        nature = self.account_nature
+        if nature == _DEBIT:
+            signed_balance = _DEBIT_SIGNED_BALANCE
+        elif nature == _CREDIT:
+            signed_balance = _CREDIT_SIGNED_BALANCE
         else:
-            logger.error(f"Account {self.account_number} has invalid nature '{self.account_nature}' during balance calculation.")
-            balance = Decimal('0.00')
+            logger.error(f"Account {self.account_number} has invalid nature '{nature}' during balance calculation.")
+            return _ZERO
+
+        if start_date and date_upto and start_date > date_upto:
+            return _ZERO # Empty range: no posted line can match
+        balance = self._snapshot_balance(signed_balance, date_upto)
+        if start_date:
+            # Movement: subtract the balance as of the day before start_date
+            balance -= self._snapshot_balance(signed_balance, start_date, inclusive=False)
         return balance
 
+    @classmethod
+    def get_dynamic_balances(cls, accounts, date_upto=None, start_date=None):
+        """
+        get_dynamic_balance() for many accounts in one query (e.g., trial balance rows).
+        `accounts` may be Account instances, PKs or a queryset; returns {account_id: Decimal}.
+        Each account's latest AccountBalanceSnapshot row per date bound is read through a
+        correlated subquery and signed by the account's nature in SQL.
+        """
+        if not isinstance(accounts, models.QuerySet):
+            accounts = [getattr(account, 'pk', account) for account in accounts]
+        accounts = cls.objects.filter(pk__in=accounts)
+        if start_date and date_upto and start_date > date_upto:
+            return dict.fromkeys(accounts.values_list('pk', flat=True), _ZERO) # Empty range
+
+        def net_debit(as_of, inclusive=True):
+            """Running debit minus credit up to as_of (before it when not inclusive), 0 without rows."""
+            snapshots = AccountBalanceSnapshot.objects.filter(account_id=models.OuterRef('pk'))
+            if as_of:
+                snapshots = snapshots.filter(**{'as_of_date__lte' if inclusive else 'as_of_date__lt': as_of})
+            latest = snapshots.order_by('-as_of_date').values(net=_DEBIT_SIGNED_BALANCE)[:1]
+            return models.functions.Coalesce(models.Subquery(latest), _ZERO, output_field=_BALANCE_FIELD)
+
+        net = net_debit(date_upto)
+        if start_date:
+            # Movement: subtract the net as of the day before start_date
+            net = net - net_debit(start_date, inclusive=False)
+        signed_balance = models.Case(
+            models.When(account_nature=_DEBIT, then=net),
+            default=-net,
+        )
+        # Quantized in Python as in _snapshot_balance
+        return {pk: balance.quantize(_CENTS) for pk, balance in accounts.values_list('pk', signed_balance)}
+
     @classmethod
     def get_accounts_for_posting(cls):
         """Class method returns active accounts where direct posting is allowed."""
-        return cls.objects.filter(is_active=True, allow_direct_posting=True)
+        return cls.objects.filter(is_active=True, allow_direct_posting=True).order_by('account_number')
+
+    @classmethod
+    def apply_balance_snapshot(cls, pk, balance, ts):
+        """
+        Stores a recalculated current_balance with a single targeted UPDATE, skipping
+        save() and its validation. Returns the number of rows updated (0 or 1).
+        """
+        return cls.objects.filter(pk=pk).update(current_balance=balance, balance_last_updated=ts)
+
+
+# Fields Account.save() validates (attname -> name); balances and audit stamps are system-set
+ACCOUNT_VALIDATED_FIELDS = {
+    field.attname: field.name for field in Account._meta.concrete_fields
+    if not field.generated and field.name not in ('id', 'current_balance', 'balance_last_updated', 'created_at', 'updated_at')
+}
+
+
+class AccountBalanceSnapshot(models.Model):
+    """
+    Read-only running totals of posted voucher lines per account, one row per
+    voucher date: running_debit / running_credit cover every posted line dated
+    on or before as_of_date. Read by Account.get_dynamic_balance().
+
+    Backed by the `account_balance_snapshot` table on PostgreSQL, kept exact by
+    triggers on voucher lines and on voucher status/date changes, and by a plain
+    view elsewhere.
+    """
+    pk = models.CompositePrimaryKey('account', 'as_of_date')
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.DO_NOTHING,
+        related_name='balance_snapshots',
+        db_constraint=False,
+    )
+    as_of_date = models.DateField()
+    running_debit = models.DecimalField(max_digits=20, decimal_places=2)
+    running_credit = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        managed = False
+        db_table = 'account_balance_snapshot'
+        verbose_name = _('Account Balance Snapshot')
+        verbose_name_plural = _('Account Balance Snapshots')
+
+
+@receiver([post_save, post_delete], sender='crp_accounting.Voucher', dispatch_uid='coa_clear_balance_memo_voucher')
+@receiver([post_save, post_delete], sender='crp_accounting.VoucherLine', dispatch_uid='coa_clear_balance_memo_voucherline')
+@receiver([post_save, post_delete], sender=Account, dispatch_uid='coa_clear_balance_memo_account')
+def _clear_balance_memo(sender, **kwargs):
+    clear_balance_memo()
+
+
+def clear_balance_memo():
+    """Drops the request's memoized get_dynamic_balance() results once postings or natures may have changed."""
+    cache = request_cache()
+    if cache is not None:
+        cache.pop(_BALANCE_CACHE_KEY, None)
+
+
+def _control_account_pks_key(party_types):
+    return 'control_account_pks:' + ','.join(party_types)
+
+
+def control_account_pks(party_type_value=None):
+    """
+    PKs of the active control accounts offered for a party type (CUSTOMER or
+    SUPPLIER); any other value returns the accounts for both.
+    Kept in the default cache for CONTROL_ACCOUNT_PKS_TIMEOUT seconds, so every worker
+    sees account changes within that time; clear_control_account_pks() drops them sooner.
+    """
+    if party_type_value in _CONTROL_PARTY_TYPES:
+        party_types = (party_type_value,)
+    else:
+        party_types = _CONTROL_PARTY_TYPES
+    key = _control_account_pks_key(party_types)
+    pks = shared_cache.get(key)
+    if pks is None:
+        pks = tuple(Account.objects.filter(
+            is_control_account=True,
+            control_account_party_type__in=party_types,
+            is_active=True,
+        ).values_list('pk', flat=True))
+        shared_cache.set(key, pks, CONTROL_ACCOUNT_PKS_TIMEOUT)
+    return pks
+
+
+@receiver([post_save, post_delete], sender=Account, dispatch_uid='coa_clear_control_account_pks')
+def _clear_control_account_pks(sender, **kwargs):
+    clear_control_account_pks()
+
+
+def clear_control_account_pks():
+    """
+    Drops the cached control_account_pks() results. Called on Account save/delete;
+    call it after QuerySet.update()/bulk writes of accounts, which send no signals.
+    Cleared again on commit, so a worker that re-read mid-transaction is not left stale.
+    """
+    keys = [_control_account_pks_key((party_type,)) for party_type in _CONTROL_PARTY_TYPES]
+    keys.append(_control_account_pks_key(_CONTROL_PARTY_TYPES))
+    shared_cache.delete_many(keys)
+    transaction.on_commit(lambda: shared_cache.delete_many(keys))
 
 #
 # import logging
@@ -17,6 +17,11 @@ from .period import AccountingPeriod
 
 logger = logging.getLogger(__name__)
 
+# Voucher header fields that feed Voucher.search_blob
+SEARCH_BLOB_SOURCE_FIELDS = frozenset({'voucher_number', 'reference', 'narration', 'party'})
+# Batch size for the search_blob bulk UPDATE after a party/account rename
+SEARCH_BLOB_BATCH_SIZE = 500
+
 # --- Sequence Configuration Model ---
 
 class VoucherSequence(models.Model):
@@ -142,6 +147,13 @@ class Voucher(models.Model):
         db_index=True,  # Index for faster checking in the task
         help_text=_("Internal flag: True if ledger balances have been updated by the posting task.")
     )
+    # Denormalized search text for the admin (header, party and line text); see refresh_search_blob()
+    search_blob = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        help_text=_("System-maintained concatenation of voucher, party and line text used for searching.")
+    )
     source_document = GenericForeignKey('content_type', 'object_id')
 
     permissions = [
@@ -163,6 +175,11 @@ class Voucher(models.Model):
         indexes = [
             models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['status', 'accounting_period']),
+            # Default ordering and the common admin filter + ordering combinations
+            models.Index(fields=['-date', '-voucher_number']),
+            models.Index(fields=['status', '-date']),
+            models.Index(fields=['accounting_period', '-date']),
+            models.Index(fields=['party', '-date']),
         ]
         permissions = [
             ("submit_voucher", "Can submit voucher for approval"),
@@ -230,9 +247,12 @@ class Voucher(models.Model):
         """Handles voucher saving, including triggering number generation."""
         is_new = self._state.adding
         original_status = None
+        original_header = None
         if not is_new:
-            try: # Fetch efficiently if needed
-                original_status = Voucher.objects.values_list('status', flat=True).get(pk=self.pk)
+            try: # Fetch efficiently if needed (status plus the searchable header values, one query)
+                original_status, *original_header = Voucher.objects.values_list(
+                    'status', 'voucher_number', 'reference', 'narration', 'party_id'
+                ).get(pk=self.pk)
             except Voucher.DoesNotExist:
                 is_new = True
 
@@ -268,8 +288,60 @@ class Voucher(models.Model):
                 raise e
         # --- End Generation Trigger ---
 
+        # Keep the admin search text current. A new voucher has no lines yet, so its header
+        # text is written with the INSERT; lines are added to the blob by whoever writes them.
+        if is_new:
+            party_name = self.party.name if self.party_id else None
+            self.search_blob = ' '.join(part for part in (self.voucher_number, self.reference, self.narration, party_name) if part)
+
         super().save(*args, **kwargs) # Proceed with the actual save
 
+        # Existing vouchers: rebuild only when a saved searchable header value actually changed
+        update_fields = kwargs.get('update_fields')
+        current_header = [self.voucher_number, self.reference, self.narration, self.party_id]
+        if (not is_new and current_header != original_header
+                and (update_fields is None or SEARCH_BLOB_SOURCE_FIELDS.intersection(update_fields))):
+            self.refresh_search_blob()
+
+    def refresh_search_blob(self):
+        """
+        Rebuilds search_blob from the header, party name and all line text.
+        Call it once after the voucher's lines have been written (VoucherLine.save()
+        does not), e.g. from the serializer, the admin or a service.
+        """
+        if not self.pk:
+            return
+        self.search_blob = Voucher.refresh_search_blobs([self.pk]).get(self.pk, '')
+
+    @classmethod
+    def refresh_search_blobs(cls, vouchers):
+        """
+        Rebuilds search_blob for `vouchers` (PKs or a queryset of them) from the stored
+        header, party name and line text: one read of the headers, one of the lines, and
+        a bulk UPDATE that never re-enters save(). Returns {voucher_pk: search_blob}.
+        """
+        parts = {
+            pk: [voucher_number, reference, narration, party_name]
+            for pk, voucher_number, reference, narration, party_name in cls.objects.filter(pk__in=vouchers)
+            .order_by().values_list('pk', 'voucher_number', 'reference', 'narration', 'party__name')
+        }
+        if not parts:
+            return {}
+        for voucher_id, *line_parts in VoucherLine.objects.filter(voucher_id__in=parts).values_list(
+            'voucher_id', 'narration', 'account__account_name', 'account__account_number'
+        ):
+            parts[voucher_id].extend(line_parts)
+        blobs = {pk: ' '.join(part for part in voucher_parts if part) for pk, voucher_parts in parts.items()}
+        if len(blobs) == 1:
+            (pk, blob), = blobs.items()
+            cls.objects.filter(pk=pk).update(search_blob=blob)
+        else:
+            cls.objects.bulk_update(
+                [cls(pk=pk, search_blob=blob) for pk, blob in blobs.items()],
+                ['search_blob'], batch_size=SEARCH_BLOB_BATCH_SIZE,
+            )
+        return blobs
+
 class VoucherApproval(models.Model):
     """Tracks the workflow history (submit, approve, reject) of a Voucher."""
     voucher = models.ForeignKey(
@@ -316,7 +388,7 @@ class VoucherApproval(models.Model):
         ]
 
     def __str__(self):
-        user_display = self.user.username if self.user else 'System'
+        user_display = self.user.get_username() if self.user else 'System'
         ts = self.action_timestamp.strftime('%Y-%m-%d %H:%M')
         return f"Voucher {self.voucher_id}: {self.get_action_type_display()} by {user_display} at {ts}"
 
@@ -401,6 +473,7 @@ class VoucherLine(models.Model):
 
         self.clean() # Run validation before saving
         super().save(*args, **kwargs)
+        # The parent's search_blob is rebuilt once by the caller after all lines are written
 
     class Meta:
         # Updated names
@@ -411,6 +484,8 @@ class VoucherLine(models.Model):
         indexes = [
              models.Index(fields=['voucher', 'account']),
              models.Index(fields=['voucher', 'dr_cr']),
+             # Party balance aggregation: lines on a control account, per voucher (covering on PostgreSQL)
+             models.Index(fields=['account', 'voucher'], include=['dr_cr', 'amount'], name='voucherline_acct_voucher_cov'),
         ]
 # from django.db import models
 # from django.utils.translation import gettext_lazy as _
@@ -1,4 +1,5 @@
 
+import functools
 import logging
 from decimal import Decimal
 from django.db import models, transaction
@@ -96,6 +97,10 @@ class Party(models.Model):
         verbose_name = _('Party')
         verbose_name_plural = _('Parties')
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['party_type', 'is_active', 'control_account']),
+            models.Index(fields=['control_account', 'is_active']),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=models.Q(credit_limit__gte=Decimal('0.00')),
@@ -136,10 +141,23 @@ class Party(models.Model):
                      'control_account': _("The selected account is not a valid Control Account for Party Type '%(party_type)s'.") % {'party_type': self.get_party_type_display()}
                  })
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remembers the loaded name so save() can tell a rename."""
+        instance = super().from_db(db, field_names, values)
+        if 'name' in field_names:
+            instance._loaded_name = values[field_names.index('name')]
+        return instance
+
     def save(self, *args, **kwargs):
-        """Ensure validation is run before saving."""
+        """Ensure validation is run before saving; a rename refreshes the party's voucher search text."""
         self.full_clean() # Run model validation including clean()
+        renamed = not self._state.adding and getattr(self, '_loaded_name', None) != self.name
         super().save(*args, **kwargs)
+        if renamed:
+            Voucher, _ = type(self)._journal_models()
+            Voucher.refresh_search_blobs(self.vouchers.values('pk'))
+        self._loaded_name = self.name
 
     # --- Balance Calculation & Related Methods ---
 
@@ -165,17 +183,13 @@ class Party(models.Model):
             logger.warning(f"Cannot calculate balance for Party '{self.name}' (ID: {self.id}): No Control Account assigned.")
             return Decimal('0.00')
 
-        # Import dynamically to avoid potential app loading issues/circular imports
-        from crp_accounting.models.journal import VoucherLine
-
-        # Base queryset: Lines hitting the control account AND related to this party
-        lines = VoucherLine.objects.filter(
-            account=self.control_account,
-            voucher__party=self
-        )
+        _, VoucherLine = type(self)._journal_models()
 
+        # Lines hitting the control account AND related to this party, built as one filter() call
+        filters = {'account': self.control_account, 'voucher__party': self}
         if date_upto:
-            lines = lines.filter(voucher__date__lte=date_upto)
+            filters['voucher__date__lte'] = date_upto
+        lines = VoucherLine.objects.filter(**filters)
 
         # Aggregate debits and credits
         aggregation = lines.aggregate(
@@ -247,17 +261,32 @@ class Party(models.Model):
                 }
             )
 
-    def get_credit_status(self):
+    @classmethod
+    @functools.cache
+    def _journal_models(cls):
+        """
+        (Voucher, VoucherLine), imported on first use to avoid the journal <-> party
+        circular import, then cached instead of re-running the import on every call.
+        """
+        from crp_accounting.models.journal import Voucher, VoucherLine
+        return Voucher, VoucherLine
+
+    def get_credit_status(self, current_balance=None):
         """
         Indicates if the party is currently within their credit limit.
 
+        Args:
+            current_balance (Decimal, optional): An already known outstanding balance
+                (e.g., a queryset annotation); calculated when None.
+
         Returns:
             str: 'Within Limit', 'Over Credit Limit', or 'N/A' (if no limit/control account).
         """
         if not self.control_account or self.credit_limit <= 0:
             return 'N/A'
 
-        current_balance = self.calculate_outstanding_balance(date_upto=timezone.now().date())
+        if current_balance is None:
+            current_balance = self.calculate_outstanding_balance(date_upto=timezone.now().date())
 
         # Check based on control account nature
         is_over_limit = False
@@ -273,12 +302,36 @@ class Party(models.Model):
         """
         Retrieves JournalEntry records associated with this party, optionally filtered by date.
         """
-        # Import dynamically
-        from crp_accounting.models.journal import Voucher
+        Voucher, _ = type(self)._journal_models()
 
-        qs = Voucher.objects.filter(party=self)
+        filters = {'party': self}
         if start_date:
-            qs = qs.filter(date__gte=start_date)
+            filters['date__gte'] = start_date
         if end_date:
-            qs = qs.filter(date__lte=end_date)
-        return qs.order_by('date', 'id') # Order chronologically
\ No newline at end of file
+            filters['date__lte'] = end_date
+        return Voucher.objects.filter(**filters).order_by('date', 'id') # Order chronologically
+
+
+class PartyBalanceCache(models.Model):
+    """
+    Read-only, periodically refreshed party balances (the lifetime result of
+    Party.calculate_outstanding_balance()) for list views.
+
+    Backed by the `party_balance_cache` materialized view on PostgreSQL
+    (refreshed by crp_accounting.refresh_party_balance_cache) and by a plain view
+    elsewhere. Parties without control-account lines have no row.
+    """
+    party = models.OneToOneField(
+        Party,
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        related_name='balance_cache',
+        db_column='party_id',
+    )
+    balance = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        managed = False
+        db_table = 'party_balance_cache'
+        verbose_name = _('Party Balance (Cached)')
+        verbose_name_plural = _('Party Balances (Cached)')
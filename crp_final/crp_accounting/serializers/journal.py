@@ -66,7 +66,7 @@ class VoucherLineSerializer(serializers.ModelSerializer):
     Handles validation and data transformation for API representation.
     """
     account = serializers.PrimaryKeyRelatedField(
-        queryset=Account.objects.filter(is_active=True, allow_direct_posting=True), # Correct field name
+        queryset=Account.objects.filter(is_active=True, allow_direct_posting=True).order_by('account_number'), # Correct field name
         help_text=_("PK of the Account (must allow direct posting).")
     )
     # Read-only fields for display convenience
@@ -402,6 +402,7 @@ class VoucherSerializer(serializers.ModelSerializer):
                 line_instance = line_serializer.save(voucher=voucher)
                 line_instances.append(line_instance)
             # No else needed due to raise_exception=True
+        voucher.refresh_search_blob() # Once, now that every line is written
 
         # Refresh to get final state (potentially including generated voucher number)
         voucher.refresh_from_db()
@@ -455,6 +456,7 @@ class VoucherSerializer(serializers.ModelSerializer):
             if ids_to_delete:
                 logger.info(f"Deleting VoucherLines {ids_to_delete} for Voucher {instance.pk}")
                 VoucherLine.objects.filter(voucher=instance, id__in=ids_to_delete).delete()
+            instance.refresh_search_blob() # Once, after all line creates/updates/deletes
 
         # Refresh instance to reflect all changes for the response
         instance.refresh_from_db()
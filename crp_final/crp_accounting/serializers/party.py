@@ -49,7 +49,7 @@ class PartyReadSerializer(serializers.ModelSerializer):
 class PartyWriteSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating Party data (POST/PUT/PATCH)."""
     control_account = serializers.PrimaryKeyRelatedField(
-        queryset=Account.objects.filter(is_active=True),
+        queryset=Account.objects.filter(is_active=True).order_by('account_number'),
         allow_null=True,
         required=False,
         help_text=_("ID of the Control Account from the Chart of Accounts.")
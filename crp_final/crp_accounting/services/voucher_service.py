@@ -14,7 +14,7 @@ from ..models.journal import (
     Voucher, VoucherLine, VoucherApproval, VoucherSequence,
     VoucherType, TransactionStatus, DrCrType, ApprovalActionType
 )
-from ..models.coa import Account
+from ..models.coa import Account, clear_balance_memo
 from ..models.party import Party
 from ..models.period import AccountingPeriod
 # --- Service Imports ---
@@ -237,6 +237,8 @@ def create_reversing_voucher(
          raise VoucherWorkflowError(_("Original voucher has no lines or uses inactive accounts, cannot reverse."))
     else:
         VoucherLine.objects.bulk_create(new_lines)
+        clear_balance_memo() # bulk_create() sends no post_save
+        reversing_voucher.refresh_search_blob() # Once, after the lines are written
 
     reversing_voucher.refresh_from_db()
 
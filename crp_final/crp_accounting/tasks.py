@@ -1,7 +1,7 @@
 import logging
 from decimal import Decimal
 from celery import shared_task
-from django.db import transaction, OperationalError
+from django.db import connection, transaction, OperationalError
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 
@@ -79,9 +79,8 @@ def update_account_balances_task(self, voucher_id: int):
 
     # If we passed the check, proceed with fetching and processing
     try:
-        # Fetch voucher with related lines and accounts
-        # Select related account for efficiency within the loop
-        voucher = Voucher.objects.prefetch_related('lines__account').get(pk=voucher_id)
+        # Fetch voucher with its lines (accounts are locked and read below)
+        voucher = Voucher.objects.prefetch_related('lines').get(pk=voucher_id)
 
         # Safety check: Ensure voucher is POSTED.
         if voucher.status != TransactionStatus.POSTED:
@@ -101,70 +100,80 @@ def update_account_balances_task(self, voucher_id: int):
             # Get timestamp once before the loop for consistency
             current_time = timezone.now()
 
+            # Net the lines per account first, so each account is locked and written once
+            line_totals = {} # account_pk -> [debit_total, credit_total]
             for line in voucher.lines.all():
                 # --- Line Validation ---
                 if not line.account_id or line.amount is None or line.amount == ZERO_DECIMAL:
                     logger.warning(f"[Task:{task_id}] Skipping invalid VoucherLine {line.pk} (Account: {line.account_id}, Amount: {line.amount}) for Voucher {voucher_id}")
                     continue
+                if line.dr_cr == DrCrType.DEBIT.value:
+                    line_totals.setdefault(line.account_id, [ZERO_DECIMAL, ZERO_DECIMAL])[0] += line.amount
+                elif line.dr_cr == DrCrType.CREDIT.value:
+                    line_totals.setdefault(line.account_id, [ZERO_DECIMAL, ZERO_DECIMAL])[1] += line.amount
+                else:
+                    logger.error(f"[Task:{task_id}] Invalid DrCrType '{line.dr_cr}' on VoucherLine {line.pk}.")
+                    # Skip this line, but don't fail the whole transaction necessarily
+                    continue
 
-                account = line.account
-                account_pk = account.pk
+            try:
+                # Lock every affected account row in one query; pk order keeps concurrent tasks deadlock-free.
+                # FOR NO KEY UPDATE (where supported) matches the non-key UPDATE below and does not block
+                # the FK KEY SHARE locks taken by concurrent VoucherLine inserts on these accounts.
+                locked_accounts = {
+                    pk: (balance, account_type) for pk, balance, account_type in
+                    Account.objects.select_for_update(no_key=connection.features.has_select_for_no_key_update)
+                    .filter(pk__in=line_totals).order_by('pk')
+                    .values_list('pk', 'current_balance', 'account_type')
+                }
+            except OperationalError as oe_lock:
+                # Could be lock contention on one of the account rows
+                logger.warning(f"[Task:{task_id}] DB lock error locking Accounts {sorted(line_totals)}: {oe_lock}. Retrying entire task.")
+                raise self.retry(exc=oe_lock)
+
+            for account_pk, (debit_total, credit_total) in line_totals.items():
+                if account_pk not in locked_accounts:
+                    # This account linked to the lines doesn't exist, log and continue with other accounts
+                    logger.error(f"[Task:{task_id}] Account {account_pk} referenced by Voucher {voucher_id} lines not found during update!")
+                    continue
+                original_balance, account_type = locked_accounts[account_pk]
 
                 try:
-                    # Lock the specific account row for update
-                    acc_to_update = Account.objects.select_for_update().get(pk=account_pk)
-
                     # Initialize balance if it's None (safer than erroring)
-                    if acc_to_update.current_balance is None:
+                    if original_balance is None:
                         logger.warning(f"[Task:{task_id}] Account {account_pk} had NULL balance. Initializing to 0.")
-                        acc_to_update.current_balance = ZERO_DECIMAL
-
-                    original_balance = acc_to_update.current_balance
-                    adjustment = line.amount
+                        original_balance = ZERO_DECIMAL
 
                     # --- Apply Adjustment using CORRECTED Helpers ---
                     # Ensure comparison uses the VALUE stored in the fields
-                    if line.dr_cr == DrCrType.DEBIT.value:
-                        if _account_affects_balance_positively_on_debit(acc_to_update.account_type):
-                            acc_to_update.current_balance += adjustment
-                        else:
-                            acc_to_update.current_balance -= adjustment
-                    elif line.dr_cr == DrCrType.CREDIT.value:
-                        if _account_affects_balance_positively_on_credit(acc_to_update.account_type):
-                            acc_to_update.current_balance += adjustment
-                        else:
-                            acc_to_update.current_balance -= adjustment
+                    new_balance = original_balance
+                    if _account_affects_balance_positively_on_debit(account_type):
+                        new_balance += debit_total
+                    else:
+                        new_balance -= debit_total
+                    if _account_affects_balance_positively_on_credit(account_type):
+                        new_balance += credit_total
                     else:
-                        logger.error(f"[Task:{task_id}] Invalid DrCrType '{line.dr_cr}' on VoucherLine {line.pk}.")
-                        # Skip this line, but don't fail the whole transaction necessarily
-                        continue
+                        new_balance -= credit_total
                     # --- End Apply Adjustment ---
 
-                    # --- Set timestamp and Save Account ---
-                    acc_to_update.balance_last_updated = current_time
-                    acc_to_update.save(
-                        update_fields=['current_balance', 'balance_last_updated']
-                    )
-                    # --- End Set timestamp and Save Account ---
+                    # Single targeted UPDATE of the balance and its timestamp (no save()/full_clean())
+                    Account.apply_balance_snapshot(account_pk, new_balance, current_time)
 
                     processed_accounts.add(account_pk)
-                    logger.debug(f"[Task:{task_id}] Updated balance Account {account_pk}: {original_balance} -> {acc_to_update.current_balance} (Line {line.pk}, Time: {current_time})")
+                    logger.debug(f"[Task:{task_id}] Updated balance Account {account_pk}: {original_balance} -> {new_balance} (Voucher {voucher_id}, Time: {current_time})")
 
                 # --- Error Handling for Single Account Update ---
-                except Account.DoesNotExist:
-                     # This account linked to the line doesn't exist, log and continue with other lines
-                     logger.error(f"[Task:{task_id}] Account {account_pk} referenced by VoucherLine {line.pk} not found during update!")
                 except OperationalError as oe_acct:
-                     # Could be lock contention on this specific account row
-                     logger.warning(f"[Task:{task_id}] DB lock error updating Account {account_pk}: {oe_acct}. Retrying entire task.")
+                     logger.warning(f"[Task:{task_id}] DB error updating Account {account_pk}: {oe_acct}. Retrying entire task.")
                      # Retry the whole task because the atomic block needs to succeed entirely
                      raise self.retry(exc=oe_acct)
                 except Exception as e_acct:
                      # Catch other errors during this specific account update
-                     logger.exception(f"[Task:{task_id}] Unexpected error updating Account {account_pk} (Line {line.pk}): {e_acct}")
+                     logger.exception(f"[Task:{task_id}] Unexpected error updating Account {account_pk} (Voucher {voucher_id}): {e_acct}")
                      # Reraise the exception to ensure the transaction.atomic() block rolls back
                      raise
-            # --- End For Loop over Lines ---
+            # --- End For Loop over Accounts ---
 
             # Transaction commits here if no exceptions were raised within the 'with' block
             logger.debug(f"[Task:{task_id}] Atomic balance update transaction completed successfully for Voucher {voucher_id}.")
@@ -215,4 +224,19 @@ def update_account_balances_task(self, voucher_id: int):
             logger.critical(f"[Task:{task_id}] Max retries exceeded for Voucher {voucher_id}. Balance update failed permanently. ALERTING NEEDED.")
         except Exception as retry_e:
              # Catch potential errors during the retry call itself
-             logger.error(f"[Task:{task_id}] Error attempting to retry task for Voucher {voucher_id}: {retry_e}")
\ No newline at end of file
+             logger.error(f"[Task:{task_id}] Error attempting to retry task for Voucher {voucher_id}: {retry_e}")
+
+
+@shared_task(name="crp_accounting.refresh_party_balance_cache")
+def refresh_party_balance_cache_task():
+    """
+    Refreshes the party_balance_cache materialized view read by the Party admin list.
+    Runs on a schedule (CELERY_BEAT_SCHEDULE); on non-PostgreSQL databases the
+    cache is a plain view that is always current, so there is nothing to do.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        # CONCURRENTLY keeps the view readable during the refresh (needs its unique index)
+        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY party_balance_cache")
+    logger.info("Refreshed party_balance_cache materialized view.")
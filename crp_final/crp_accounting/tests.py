@@ -1,3 +1,479 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, PAGE_VAR
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.test import RequestFactory, TestCase, override_settings
+
+from crp_core.enums import AccountType, PartyType, TransactionStatus
+from crp_core.middleware import RequestCacheMiddleware
+from crp_accounting.admin.party import BALANCE_OPT_IN_VAR, outstanding_balance_expression
+from crp_accounting.models import Account, AccountGroup, FiscalYear, Party, PartyBalanceCache
+from crp_accounting.models import coa as coa_models
+from crp_accounting.models.coa import AccountBalanceSnapshot, clear_balance_memo, control_account_pks
+from crp_accounting.models.journal import Voucher, VoucherApproval, VoucherLine
+from crp_accounting.models.period import AccountingPeriod
+from crp_accounting.tasks import refresh_party_balance_cache_task
+
+
+class AccountingFixtureMixin:
+    """Minimal chart of accounts, period and party shared by the test cases."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = AccountGroup.objects.create(name='Test Group')
+        cls.cash = Account.objects.create(
+            account_number='T-1000', account_name='Test Cash', account_group=cls.group,
+            account_type=AccountType.ASSET.value,
+        )
+        cls.receivable = Account.objects.create(
+            account_number='T-1200', account_name='Test Receivable', account_group=cls.group,
+            account_type=AccountType.ASSET.value,
+            is_control_account=True, control_account_party_type=PartyType.CUSTOMER.value,
+        )
+        cls.equity = Account.objects.create(
+            account_number='T-3000', account_name='Test Capital', account_group=cls.group,
+            account_type=AccountType.EQUITY.value,
+        )
+        cls.fiscal_year = FiscalYear.objects.create(name='FY-T', start_date=date(2024, 1, 1), end_date=date(2024, 12, 31))
+        cls.period = AccountingPeriod.objects.create(
+            start_date=date(2024, 1, 1), end_date=date(2024, 12, 31), fiscal_year=cls.fiscal_year,
+        )
+        cls.party = Party.objects.create(
+            name='Test Customer', party_type=PartyType.CUSTOMER.value, control_account=cls.receivable,
+        )
+
+    def make_voucher(self, lines=(), voucher_date=date(2024, 3, 1), **kwargs):
+        """Draft voucher with (account, dr_cr, amount) lines; the search text is refreshed once."""
+        kwargs.setdefault('narration', 'Test voucher')
+        voucher = Voucher.objects.create(date=voucher_date, accounting_period=self.period, **kwargs)
+        for account, dr_cr, amount in lines:
+            VoucherLine.objects.create(voucher=voucher, account=account, dr_cr=dr_cr, amount=Decimal(amount))
+        voucher.refresh_search_blob()
+        return voucher
+
+
+class VoucherSearchBlobTests(AccountingFixtureMixin, TestCase):
+    """Voucher.search_blob is rebuilt once per write batch and follows renames."""
+
+    def stored_blob(self, voucher):
+        return Voucher.objects.values_list('search_blob', flat=True).get(pk=voucher.pk)
+
+    def test_new_voucher_stores_header_text_with_the_insert(self):
+        voucher = Voucher.objects.create(
+            date=date(2024, 3, 1), accounting_period=self.period, party=self.party,
+            reference='REF-1', narration='Opening',
+        )
+        self.assertEqual(self.stored_blob(voucher), 'REF-1 Opening Test Customer')
+
+    def test_line_save_does_not_rebuild_the_blob(self):
+        voucher = self.make_voucher()
+        # Parent status check + INSERT; the caller refreshes the blob once afterwards
+        with self.assertNumQueries(2):
+            VoucherLine.objects.create(voucher=voucher, account=self.cash, dr_cr='DEBIT', amount=Decimal('5.00'))
+        voucher.refresh_search_blob()
+        self.assertIn('Test Cash T-1000', self.stored_blob(voucher))
+
+    def test_unchanged_voucher_save_skips_the_rebuild(self):
+        voucher = self.make_voucher([(self.cash, 'DEBIT', '5.00'), (self.equity, 'CREDIT', '5.00')])
+        voucher = Voucher.objects.get(pk=voucher.pk)
+        # Original status/header read, period lock check in clean(), UPDATE; no blob rebuild
+        with self.assertNumQueries(3):
+            voucher.save()
+        voucher.narration = 'Changed narration'
+        voucher.save()
+        self.assertIn('Changed narration', self.stored_blob(voucher))
+
+    def test_party_and_account_renames_refresh_the_blob(self):
+        voucher = self.make_voucher([(self.cash, 'DEBIT', '5.00'), (self.equity, 'CREDIT', '5.00')], party=self.party)
+        other = self.make_voucher([(self.cash, 'DEBIT', '7.00'), (self.equity, 'CREDIT', '7.00')], party=self.party)
+        party = Party.objects.get(pk=self.party.pk)
+        party.name = 'Renamed Customer'
+        party.save()
+        account = Account.objects.get(pk=self.cash.pk)
+        account.account_name = 'Renamed Cash'
+        account.save()
+        blob = self.stored_blob(voucher)
+        self.assertIn('Renamed Customer', blob)
+        self.assertIn('Renamed Cash', blob)
+        self.assertNotIn('Test Customer', blob)
+        self.assertNotIn('Test Cash', blob)
+        self.assertEqual(self.stored_blob(other), blob) # Same header and line text, refreshed in bulk
+
+
+@override_settings(MIDDLEWARE=[*settings.MIDDLEWARE, 'crp_core.middleware.QueryCountMiddleware'])
+class AdminChangelistQueryTests(AccountingFixtureMixin, TestCase):
+    """
+    The accounting changelists run a fixed number of queries whatever the row count,
+    and QueryCountMiddleware reports no repeated (N+1) statements on them.
+    """
+    # Party list twice: with the balance column, and with it hidden ('Show all')
+    CHANGELISTS = ('voucher/', 'party/', f'party/?{ALL_VAR}=', 'voucherapproval/')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = get_user_model().objects.create_superuser('admin@example.com', 'Admin', True, 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_rows(self, count):
+        """`count` parties, each with a voucher (two lines) and an approval record; every other one has a credit limit."""
+        start = Party.objects.count()
+        for i in range(start, start + count):
+            party = Party.objects.create(
+                name=f'Customer {i}', party_type=PartyType.CUSTOMER.value, control_account=self.receivable,
+                credit_limit=Decimal('100.00') if i % 2 else Decimal('0.00'),
+            )
+            voucher = self.make_voucher(
+                [(self.receivable, 'DEBIT', '10.00'), (self.cash, 'CREDIT', '10.00')],
+                party=party, voucher_number=f'TV-{i}',
+            )
+            VoucherApproval.objects.create(voucher=voucher, user=self.user, action_type='SUBMITTED')
+
+    def changelist_query_counts(self):
+        counts = {}
+        for changelist in self.CHANGELISTS:
+            response = self.client.get(f'/admin/crp_accounting/{changelist}')
+            self.assertEqual(response.status_code, 200, changelist)
+            self.assertEqual(response['X-Query-Duplicates'], '0', changelist)
+            counts[changelist] = int(response['X-Query-Count'])
+        return counts
+
+    def test_changelists_do_not_scale_queries_with_rows(self):
+        self.add_rows(3)
+        few = self.changelist_query_counts()
+        self.add_rows(6)
+        self.assertEqual(self.changelist_query_counts(), few)
+        for query in ('', f'?{ALL_VAR}='): # Credit status read from the annotation either way
+            response = self.client.get(f'/admin/crp_accounting/party/{query}')
+            self.assertContains(response, 'Within Limit', count=Party.objects.filter(credit_limit__gt=0).count())
+
+
+class DynamicBalanceTests(AccountingFixtureMixin, TestCase):
+    """
+    get_dynamic_balance()/get_dynamic_balances() read AccountBalanceSnapshot (trigger-maintained
+    on PostgreSQL, a view elsewhere) and must match a direct aggregate of the posted voucher lines,
+    including after queryset writes that bypass save().
+    """
+    BOUNDS = (
+        (None, None),
+        (date(2024, 3, 1), None),
+        (date(2024, 2, 29), None),
+        (None, date(2024, 3, 2)),
+        (date(2024, 6, 15), date(2024, 3, 1)),
+        (date(2024, 6, 14), date(2024, 3, 2)),
+        (date(2024, 3, 1), date(2024, 6, 15)), # Empty range
+    )
+
+    def setUp(self):
+        self.march = self.make_voucher([(self.cash, 'DEBIT', '10.10'), (self.equity, 'CREDIT', '10.10')])
+        self.june = self.make_voucher(
+            [(self.cash, 'DEBIT', '20.50'), (self.equity, 'CREDIT', '20.50')], voucher_date=date(2024, 6, 15),
+        )
+        self.set_status(self.march, TransactionStatus.POSTED)
+        self.set_status(self.june, TransactionStatus.POSTED)
+
+    def set_status(self, voucher, status):
+        Voucher.objects.filter(pk=voucher.pk).update(status=status)
+
+    def line_aggregate(self, account, date_upto=None, start_date=None):
+        """The balance straight from the posted voucher lines, signed by the account's nature."""
+        lines = VoucherLine.objects.filter(account=account, voucher__status=TransactionStatus.POSTED)
+        if date_upto:
+            lines = lines.filter(voucher__date__lte=date_upto)
+        if start_date:
+            lines = lines.filter(voucher__date__gte=start_date)
+        totals = lines.aggregate(
+            debit=Sum('amount', filter=Q(dr_cr='DEBIT'), default=Decimal('0.00')),
+            credit=Sum('amount', filter=Q(dr_cr='CREDIT'), default=Decimal('0.00')),
+        )
+        net = totals['debit'] - totals['credit']
+        return (net if account.is_debit_nature else -net).quantize(Decimal('0.01'))
+
+    def assertBalancesMatchLines(self):
+        accounts = [Account.objects.get(pk=account.pk) for account in (self.cash, self.equity, self.receivable)]
+        for date_upto, start_date in self.BOUNDS:
+            bulk = Account.get_dynamic_balances(accounts, date_upto=date_upto, start_date=start_date)
+            for account in accounts:
+                expected = self.line_aggregate(account, date_upto, start_date)
+                label = (account.account_number, date_upto, start_date)
+                for balance in (account.get_dynamic_balance(date_upto=date_upto, start_date=start_date), bulk[account.pk]):
+                    self.assertEqual(balance, expected, label)
+                    self.assertEqual(balance.as_tuple().exponent, -2, label) # Two decimals on every backend
+
+    def test_matches_line_aggregate_across_date_bounds(self):
+        self.assertEqual(self.cash.get_dynamic_balance(), Decimal('30.60'))
+        self.assertEqual(self.equity.get_dynamic_balance(date_upto=date(2024, 3, 31)), Decimal('10.10'))
+        self.assertBalancesMatchLines()
+
+    def test_follows_line_insert_update_delete_on_posted_voucher(self):
+        VoucherLine.objects.bulk_create([
+            VoucherLine(voucher=self.march, account=self.cash, dr_cr='DEBIT', amount=Decimal('4.45')),
+            VoucherLine(voucher=self.march, account=self.equity, dr_cr='CREDIT', amount=Decimal('4.45')),
+        ])
+        self.assertBalancesMatchLines()
+        self.march.lines.filter(account=self.cash, amount=Decimal('4.45')).update(amount=Decimal('1.05'))
+        self.march.lines.filter(account=self.equity, amount=Decimal('4.45')).update(account=self.receivable)
+        self.assertBalancesMatchLines()
+        self.march.lines.filter(amount__in=[Decimal('1.05'), Decimal('4.45')]).delete()
+        self.assertBalancesMatchLines()
+
+    def test_follows_voucher_posting_and_unposting(self):
+        self.set_status(self.march, TransactionStatus.DRAFT)
+        self.assertBalancesMatchLines()
+        self.set_status(self.march, TransactionStatus.POSTED)
+        self.set_status(self.june, TransactionStatus.CANCELLED)
+        self.assertBalancesMatchLines()
+
+    def test_follows_voucher_date_change(self):
+        Voucher.objects.filter(pk=self.june.pk).update(date=date(2024, 2, 10))
+        self.assertBalancesMatchLines()
+        Voucher.objects.filter(pk=self.march.pk).update(date=date(2024, 9, 30))
+        self.assertBalancesMatchLines()
+
+
+class PartyAdminBalanceOptInTests(AccountingFixtureMixin, TestCase):
+    """?_balance=1 survives the party changelist's own links and is never applied as a field lookup."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = get_user_model().objects.create_superuser('admin@example.com', 'Admin', True, 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_changelist(self, query):
+        response = self.client.get(f'/admin/crp_accounting/party/?{query}')
+        self.assertEqual(response.status_code, 200) # No ?e=1 redirect for an unknown lookup
+        return response
+
+    def balance_computed(self, cl):
+        """True when the rows carry the balance; otherwise the column renders a placeholder."""
+        return all(hasattr(party, 'outstanding_balance_ann') for party in cl.result_list)
+
+    def test_opt_in_is_kept_in_pagination_sort_and_filter_links(self):
+        response = self.get_changelist(f'{BALANCE_OPT_IN_VAR}=1&{ALL_VAR}=')
+        cl = response.context['cl']
+        self.assertTrue(self.balance_computed(cl))
+        self.assertEqual(cl.result_count, 1)
+        for link in (
+            cl.get_query_string({PAGE_VAR: 2}),
+            cl.get_query_string({ORDER_VAR: '0'}),
+            cl.get_query_string({'is_active__exact': '1'}),
+        ):
+            self.assertIn(f'{BALANCE_OPT_IN_VAR}=1', link)
+        self.assertContains(response, f'name="{BALANCE_OPT_IN_VAR}" value="1"') # Search form hidden input
+
+    def test_balance_is_computed_on_the_first_page_only_by_default(self):
+        first_page = self.get_changelist('').context['cl']
+        self.assertTrue(self.balance_computed(first_page))
+        for query in (f'{ALL_VAR}=', f'{BALANCE_OPT_IN_VAR}=0'):
+            cl = self.get_changelist(query).context['cl']
+            self.assertFalse(self.balance_computed(cl), query)
+            self.assertEqual(cl.list_display, first_page.list_display, query) # Column kept: ?o= indexes stay put
+
+    def test_paging_through_a_list_sorted_by_balance(self):
+        for i, amount in enumerate(('40.00', '10.00', '30.00', '10.00', '50.00', '20.00', '0.50')):
+            party = Party.objects.create(
+                name=f'Customer {i}', party_type=PartyType.CUSTOMER.value, control_account=self.receivable,
+            )
+            voucher = self.make_voucher([(self.receivable, 'DEBIT', amount), (self.cash, 'CREDIT', amount)], party=party)
+            Voucher.objects.filter(pk=voucher.pk).update(status=TransactionStatus.POSTED)
+        expected = list(
+            Party.objects.annotate(balance=Coalesce(Subquery(
+                PartyBalanceCache.objects.filter(party=OuterRef('pk')).values('balance')[:1]
+            ), Decimal('0.00'))).order_by('balance', '-pk').values_list('name', flat=True)
+        )
+        column = self.get_changelist('').context['cl'].list_display.index('display_calculated_balance')
+        names = []
+        with mock.patch.object(admin.site._registry[Party], 'list_per_page', 3):
+            for page in (1, 2, 3): # Plain page links, without ?_balance=1
+                cl = self.get_changelist(f'{ORDER_VAR}={column}&{PAGE_VAR}={page}').context['cl']
+                self.assertTrue(self.balance_computed(cl), page)
+                names += [party.name for party in cl.result_list]
+        self.assertEqual(names, expected)
+
+
+class DynamicBalanceMemoTests(AccountingFixtureMixin, TestCase):
+    """get_dynamic_balance() is memoized inside a request and dropped once postings change."""
+
+    def in_request(self, func):
+        """Runs func() inside RequestCacheMiddleware, i.e. with a live request_cache()."""
+        return RequestCacheMiddleware(lambda request: func())(RequestFactory().get('/'))
+
+    def test_repeat_calls_hit_the_memo_until_a_posting_is_saved(self):
+        voucher = self.make_voucher([(self.cash, 'DEBIT', '10.10'), (self.equity, 'CREDIT', '10.10')], voucher_number='TV-M')
+
+        def request_body():
+            self.assertEqual(self.cash.get_dynamic_balance(), Decimal('0.00'))
+            with self.assertNumQueries(0):
+                self.assertEqual(self.cash.get_dynamic_balance(), Decimal('0.00'))
+            voucher.status = TransactionStatus.POSTED
+            voucher.save() # post_save drops the memo
+            self.assertEqual(self.cash.get_dynamic_balance(), Decimal('10.10'))
+
+        self.in_request(request_body)
+
+    def test_signal_less_writes_need_an_explicit_clear(self):
+        voucher = self.make_voucher([(self.cash, 'DEBIT', '10.10'), (self.equity, 'CREDIT', '10.10')])
+
+        def request_body():
+            self.assertEqual(self.cash.get_dynamic_balance(), Decimal('0.00'))
+            Voucher.objects.filter(pk=voucher.pk).update(status=TransactionStatus.POSTED) # No post_save
+            self.assertEqual(self.cash.get_dynamic_balance(), Decimal('0.00'))
+            clear_balance_memo()
+            self.assertEqual(self.cash.get_dynamic_balance(), Decimal('10.10'))
+
+        self.in_request(request_body)
+
+    def test_no_memo_outside_a_request(self):
+        self.cash.get_dynamic_balance()
+        with self.assertNumQueries(1):
+            self.cash.get_dynamic_balance()
+
+
+class AccountAdminOrderingTests(AccountingFixtureMixin, TestCase):
+    """Without Account.Meta.ordering, the account changelist and autocomplete still sort by group, then number."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = get_user_model().objects.create_superuser('admin@example.com', 'Admin', True, 'pw')
+        # Created last (highest pk) but sorts last by group name
+        Account.objects.create(
+            account_number='T-0500', account_name='Test Suspense', account_type=AccountType.ASSET.value,
+            account_group=AccountGroup.objects.create(name='Z Group'),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_changelist_and_autocomplete_order_by_group_then_number(self):
+        expected = ['T-1000', 'T-1200', 'T-3000', 'T-0500']
+        cl = self.client.get('/admin/crp_accounting/account/').context['cl']
+        self.assertEqual([account.account_number for account in cl.result_list], expected)
+        response = self.client.get('/admin/autocomplete/', {
+            'app_label': 'crp_accounting', 'model_name': 'voucherline', 'field_name': 'account',
+        })
+        self.assertEqual(response.status_code, 200)
+        by_pk = dict(Account.objects.values_list('pk', 'account_number'))
+        self.assertEqual([by_pk[int(result['id'])] for result in response.json()['results']], expected)
+
+
+class ControlAccountPksTests(AccountingFixtureMixin, TestCase):
+    """control_account_pks() is kept in the shared cache briefly and cleared by account writes, bulk ones included."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = get_user_model().objects.create_superuser('admin@example.com', 'Admin', True, 'pw')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_with_a_timeout(self):
+        with mock.patch.object(coa_models.shared_cache, 'set', wraps=coa_models.shared_cache.set) as cache_set:
+            self.assertEqual(control_account_pks(PartyType.CUSTOMER.value), (self.receivable.pk,))
+        cache_set.assert_called_once_with(mock.ANY, (self.receivable.pk,), coa_models.CONTROL_ACCOUNT_PKS_TIMEOUT)
+        with self.assertNumQueries(0):
+            self.assertEqual(control_account_pks(PartyType.CUSTOMER.value), (self.receivable.pk,))
+
+    def test_save_and_bulk_admin_actions_clear_it(self):
+        self.assertEqual(control_account_pks(), (self.receivable.pk,))
+        self.client.force_login(self.user)
+        response = self.client.post('/admin/crp_accounting/account/', {
+            'action': 'make_inactive', '_selected_action': [self.receivable.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(control_account_pks(), ()) # queryset.update() plus an explicit clear
+        account = Account.objects.get(pk=self.receivable.pk)
+        account.is_active = True
+        account.save()
+        self.assertEqual(control_account_pks(), (self.receivable.pk,)) # post_save
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Triggers, materialized view and trigram indexes are PostgreSQL-only')
+class PostgresLedgerObjectsTests(AccountingFixtureMixin, TestCase):
+    """
+    The PostgreSQL-only objects from the RunSQL migrations: the trigger-maintained
+    account_balance_snapshot table, the party_balance_cache materialized view and the
+    trigram indexes. Run the suite against PostgreSQL to exercise them.
+    """
+
+    def assertSnapshotMatchesLines(self):
+        """Every snapshot row holds the posted line totals up to its date, and every posted date has a row."""
+        posted = VoucherLine.objects.filter(voucher__status=TransactionStatus.POSTED)
+        rows = AccountBalanceSnapshot.objects.values_list('account_id', 'as_of_date', 'running_debit', 'running_credit')
+        for account_id, as_of_date, running_debit, running_credit in rows:
+            totals = posted.filter(account_id=account_id, voucher__date__lte=as_of_date).aggregate(
+                debit=Sum('amount', filter=Q(dr_cr='DEBIT'), default=Decimal('0.00')),
+                credit=Sum('amount', filter=Q(dr_cr='CREDIT'), default=Decimal('0.00')),
+            )
+            self.assertEqual((running_debit, running_credit), (totals['debit'], totals['credit']), (account_id, as_of_date))
+        self.assertLessEqual(
+            set(posted.values_list('account_id', 'voucher__date')),
+            {(account_id, as_of_date) for account_id, as_of_date, *_ in rows},
+        )
+
+    def post(self, voucher, number):
+        voucher.voucher_number = number
+        voucher.status = TransactionStatus.POSTED
+        voucher.save()
+
+    def test_snapshot_triggers_follow_posting_and_edits(self):
+        march = self.make_voucher([(self.cash, 'DEBIT', '10.10'), (self.equity, 'CREDIT', '10.10')])
+        june = self.make_voucher(
+            [(self.cash, 'CREDIT', '2.25'), (self.equity, 'DEBIT', '2.25')], voucher_date=date(2024, 6, 15),
+        )
+        self.assertSnapshotMatchesLines() # Drafts add nothing
+        self.post(march, 'PG-1')
+        self.post(june, 'PG-2')
+        self.assertSnapshotMatchesLines()
+
+        # Line insert, update and delete on a posted voucher (queryset writes, so only the triggers see them)
+        VoucherLine.objects.bulk_create([
+            VoucherLine(voucher=march, account=self.receivable, dr_cr='DEBIT', amount=Decimal('4.45')),
+            VoucherLine(voucher=march, account=self.equity, dr_cr='CREDIT', amount=Decimal('4.45')),
+        ])
+        self.assertSnapshotMatchesLines()
+        march.lines.filter(account=self.receivable).update(amount=Decimal('1.05'), account=self.cash)
+        march.lines.filter(amount=Decimal('4.45')).update(amount=Decimal('1.05'))
+        self.assertSnapshotMatchesLines()
+        march.lines.filter(amount=Decimal('1.05')).delete()
+        self.assertSnapshotMatchesLines()
+
+        # Date moves across another posted voucher, then cancellation
+        Voucher.objects.filter(pk=march.pk).update(date=date(2024, 9, 30))
+        self.assertSnapshotMatchesLines()
+        june.status = TransactionStatus.CANCELLED
+        june.save()
+        self.assertSnapshotMatchesLines()
+        self.assertEqual(self.cash.get_dynamic_balance(), Decimal('10.10'))
+
+    def test_party_balance_cache_matches_lines_after_refresh(self):
+        voucher = self.make_voucher(
+            [(self.receivable, 'DEBIT', '12.34'), (self.cash, 'CREDIT', '12.34')], party=self.party,
+        )
+        self.post(voucher, 'PG-3')
+        refresh_party_balance_cache_task()
+        cached = dict(PartyBalanceCache.objects.values_list('party_id', 'balance'))
+        exact = dict(Party.objects.annotate(balance=outstanding_balance_expression()).values_list('pk', 'balance'))
+        self.assertEqual(cached, {self.party.pk: Decimal('12.34')})
+        self.assertEqual(cached[self.party.pk], exact[self.party.pk])
+
+    def test_trigram_indexes_exist(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname FROM pg_indexes WHERE indexname IN ('voucher_search_blob_trgm', 'accountgroup_name_trgm')"
+            )
+            self.assertEqual({name for name, in cursor.fetchall()}, {'voucher_search_blob_trgm', 'accountgroup_name_trgm'})
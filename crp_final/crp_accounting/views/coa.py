@@ -24,7 +24,7 @@ from drf_spectacular.utils import (
 )
 
 # --- Model Imports ---
-from ..models.coa import Account, AccountGroup
+from ..models.coa import Account, AccountGroup, clear_control_account_pks
 from ..models.journal import VoucherLine, TransactionStatus # Added TransactionStatus
 
 # --- Serializer Imports ---
@@ -38,6 +38,8 @@ from ..serializers import (
     AccountLedgerResponseSerializer # Ledger serializer
 )
 from django.utils.translation import gettext_lazy as _
+# --- FilterSet Import ---
+from ..filters import AccountFilterSet
 # --- Service Imports ---
 from ..services import ledger_service # Import the ledger service
 
@@ -135,18 +137,7 @@ class AccountViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated] # TODO: Refine permissions
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    # Define specific filter lookups
-    filterset_fields = {
-        'account_group': ['exact'],
-        'account_group__name': ['exact', 'icontains'],
-        'account_type': ['exact', 'in'], # Allow filtering by multiple types
-        'account_nature': ['exact'],
-        'currency': ['exact'],
-        'is_active': ['exact'],
-        'allow_direct_posting': ['exact'],
-        'is_control_account': ['exact'],
-        'control_account_party_type': ['exact', 'isnull'],
-    }
+    filterset_class = AccountFilterSet # Specific filter lookups, incl. the generated account_nature
     search_fields = ['account_number', 'account_name', 'description', 'account_group__name']
     ordering_fields = [
         'account_number', 'account_name', 'account_group__name', 'account_type',
@@ -233,6 +224,7 @@ class AccountViewSet(viewsets.ModelViewSet):
            return Response({'detail': _("No account IDs provided.")}, status=status.HTTP_400_BAD_REQUEST)
 
        updated_count = Account.objects.filter(pk__in=account_ids).update(is_active=True)
+       clear_control_account_pks() # update() sends no post_save
        return Response({'message': _("Successfully activated %(count)d accounts.") % {'count': updated_count}})
 
     @extend_schema(summary="Bulk Deactivate Accounts") # Schema simplified
@@ -250,6 +242,7 @@ class AccountViewSet(viewsets.ModelViewSet):
         #    return Response({'detail': _("Cannot deactivate accounts with non-zero balance.")}, status=status.HTTP_400_BAD_REQUEST)
 
         updated_count = Account.objects.filter(pk__in=account_ids).update(is_active=False)
+        clear_control_account_pks() # update() sends no post_save
         return Response({'message': _("Successfully deactivated %(count)d accounts.") % {'count': updated_count}})
 
 
@@ -0,0 +1,92 @@
+"""
+Project middleware: a per-request memo store, and a development middleware for
+spotting ORM regressions (N+1 queries) in admin pages.
+
+Why this file exists:
+The crp_accounting admin changelists were tuned to run a fixed number of queries
+per page (annotations, select_related, cached counts). This middleware counts the
+queries each matching request runs and flags SQL statements executed repeatedly,
+which is the signature of an N+1 loop, so such regressions show up while developing.
+It is only installed when DEBUG is on (see settings.MIDDLEWARE).
+
+RequestCacheMiddleware is always installed. It gives each request an empty dict
+(see request_cache()) that code such as Account.get_dynamic_balance uses to avoid
+recomputing the same value twice within one request.
+"""
+
+import logging
+from collections import Counter
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Context-local (thread / async task) holder of the current request's memo dict
+_request_local = Local()
+
+
+def request_cache():
+    """
+    Returns the current request's memo dict, or None outside a request
+    (Celery tasks, management commands), where callers should not cache.
+    """
+    return getattr(_request_local, 'cache', None)
+
+
+class RequestCacheMiddleware:
+    """Opens an empty request_cache() for each request and discards it afterwards."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _request_local.cache = {}
+        try:
+            return self.get_response(request)
+        finally:
+            del _request_local.cache
+
+# Paths inspected unless settings.QUERY_COUNT_PATH_PREFIXES overrides them
+DEFAULT_PATH_PREFIXES = ('/admin/crp_accounting/',)
+# Same SQL (ignoring parameters) executed more often than this is reported as N+1
+DEFAULT_DUPLICATE_THRESHOLD = 5
+
+
+class QueryCountMiddleware:
+    """
+    Counts DB queries per request and reports repeated statements.
+
+    Adds `X-Query-Count` and `X-Query-Duplicates` response headers and logs a
+    warning listing statements repeated more than the threshold.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.path_prefixes = tuple(getattr(settings, 'QUERY_COUNT_PATH_PREFIXES', DEFAULT_PATH_PREFIXES))
+        self.duplicate_threshold = getattr(settings, 'QUERY_COUNT_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD)
+
+    def __call__(self, request):
+        if not request.path.startswith(self.path_prefixes):
+            return self.get_response(request)
+
+        statements = Counter()
+
+        def count_query(execute, sql, params, many, context):
+            statements[sql] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+
+        repeated = {sql: n for sql, n in statements.items() if n > self.duplicate_threshold}
+        response['X-Query-Count'] = str(sum(statements.values()))
+        response['X-Query-Duplicates'] = str(len(repeated))
+        if repeated:
+            logger.warning(
+                "Possible N+1 on %s: %d statement(s) repeated more than %d times: %s",
+                request.path, len(repeated), self.duplicate_threshold,
+                '; '.join(f"{n}x {sql[:200]}" for sql, n in repeated.items()),
+            )
+        return response
@@ -64,8 +64,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Per-request memo store (e.g., Account.get_dynamic_balance results)
+    'crp_core.middleware.RequestCacheMiddleware',
 ]
 
+# Development only: per-request query counts / N+1 warnings for the accounting admin
+if DEBUG:
+    MIDDLEWARE.append('crp_core.middleware.QueryCountMiddleware')
+
 ROOT_URLCONF = 'crp_final.urls'
 
 TEMPLATES = [
@@ -171,6 +177,13 @@ SIMPLE_JWT = {
 }
 
 CELERY_TASK_ALWAYS_EAGER = True
+CELERY_BEAT_SCHEDULE = {
+    # Party admin balances are read from this materialized view (PostgreSQL)
+    'refresh-party-balance-cache': {
+        'task': 'crp_accounting.refresh_party_balance_cache',
+        'schedule': timedelta(minutes=5),
+    },
+}
 
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = config('EMAIL_HOST')
@@ -300,4 +313,4 @@ CSRF_TRUSTED_ORIGINS = [
 GRAPPELLI_ADMIN_TITLE = "My CRP System"
 
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
\ No newline at end of file
+STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'